@@ -0,0 +1,171 @@
+"""
+Versioned on-disk model artifacts.
+
+Layout (one directory per trained version, CURRENT names the one being served):
+
+    models/<pathway>/CURRENT
+    models/<pathway>/<version>/manifest.json   format version, feature/target columns, shapes
+    models/<pathway>/<version>/vocab.json      per-feature classes (code = position) + fallback codes
+    models/<pathway>/<version>/metadata.json   target labels and one dataset row per label, column-wise
+    models/<pathway>/<version>/forest_*.npy    CompiledForest node arrays
+    models/<pathway>/<version>/table_*.npy     optional precomputed lookup table
+
+The .npy files are opened with mmap_mode='r', so loading is near-instant and every process
+serving the same version shares the pages through the OS page cache.
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+from compiled_forest import CompiledForest
+
+ARTIFACT_ROOT = os.environ.get("MODEL_ARTIFACT_DIR", "models")
+FORMAT_VERSION = 1
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "leaf_slot", "leaf_values", "roots")
+TABLE_ARRAYS = ("dims", "probs", "top_idx")
+KEEP_VERSIONS = 3
+
+def _write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, separators=(",", ":"))
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def current_version(pathway, root=ARTIFACT_ROOT):
+    """Version currently published for a pathway, or None if it has never been saved"""
+    try:
+        with open(os.path.join(root, pathway, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def current_manifest(pathway, root=ARTIFACT_ROOT):
+    """manifest.json of the version currently published for a pathway (None if there is none)"""
+    version = current_version(pathway, root)
+    if version is None:
+        return None
+    try:
+        return _read_json(os.path.join(root, pathway, version, "manifest.json"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+def publish_version(pathway, version, root=ARTIFACT_ROOT):
+    """Atomically point CURRENT at an already written version"""
+    pointer = os.path.join(root, pathway, "CURRENT")
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, pointer)
+
+def prune_versions(pathway, keep=KEEP_VERSIONS, root=ARTIFACT_ROOT):
+    """Delete all but the newest `keep` versions (never the current one)"""
+    base = os.path.join(root, pathway)
+    current = current_version(pathway, root)
+    versions = sorted(d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)) and not d.startswith("."))
+    for version in versions[:-keep] if keep else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(base, version), ignore_errors=True)
+
+def save_artifacts(pathway, pack, table=None, root=ARTIFACT_ROOT, manifest_extra=None):
+    """
+    Write a new version of a pathway's model and publish it as CURRENT.
+    pack: a training pack after MLModel.prepare_pack (model, vocab, fallback_codes, labels, metadata...)
+    returns: the new version string
+    """
+    version = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    base = os.path.join(root, pathway)
+    os.makedirs(base, exist_ok=True)
+    # build in a hidden directory and rename, so readers never see a half-written version
+    tmp_dir = os.path.join(base, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+
+    forest = CompiledForest.from_sklearn(pack["model"])
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"forest_{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+    if table is not None:
+        for name in TABLE_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"table_{name}.npy"), np.ascontiguousarray(table[name]))
+
+    feature_cols = list(pack["feature_cols"])
+    _write_json(os.path.join(tmp_dir, "vocab.json"), {
+        "feature_cols": feature_cols,
+        # code = position in the list
+        "vocab": {col: sorted(pack["vocab"][col], key=pack["vocab"][col].get) for col in feature_cols},
+        "fallback_codes": [int(c) for c in pack["fallback_codes"]],
+    })
+
+    labels = [str(label) for label in pack["labels"]]
+    metadata_cols = list(pack["raw_df"].columns)
+    # column-wise: one value per class, null where a class has no dataset row
+    columns = {col: [meta.get(col) for meta in pack["metadata"]] for col in metadata_cols}
+    _write_json(os.path.join(tmp_dir, "metadata.json"), {"labels": labels, "columns": columns})
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "pathway": pathway,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "feature_cols": feature_cols,
+        "target_col": pack["target_col"],
+        "n_classes": len(labels),
+        "n_trees": len(forest.roots),
+        "max_depth": forest.max_depth,
+        "n_training_rows": len(pack["raw_df"]),
+        "has_table": table is not None,
+    }
+    manifest.update(manifest_extra or {})
+    _write_json(os.path.join(tmp_dir, "manifest.json"), manifest)
+
+    os.rename(tmp_dir, os.path.join(base, version))
+    publish_version(pathway, version, root)
+    prune_versions(pathway, root=root)
+    return version
+
+def load_artifacts(pathway, version=None, root=ARTIFACT_ROOT, mmap=True):
+    """
+    Open a saved version (CURRENT by default) as an MLModel pack dict.
+    Arrays are memory-mapped read-only unless mmap=False.
+    """
+    version = version or current_version(pathway, root)
+    if version is None:
+        raise FileNotFoundError(f"No model artifacts for {pathway} under {root}")
+    path = os.path.join(root, pathway, version)
+    manifest = _read_json(os.path.join(path, "manifest.json"))
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')} in {path}")
+
+    mmap_mode = "r" if mmap else None
+    forest_arrays = {name: np.load(os.path.join(path, f"forest_{name}.npy"), mmap_mode=mmap_mode)
+                     for name in FOREST_ARRAYS}
+    forest = CompiledForest(max_depth=manifest["max_depth"], **forest_arrays)
+
+    vocab_file = _read_json(os.path.join(path, "vocab.json"))
+    metadata_file = _read_json(os.path.join(path, "metadata.json"))
+    labels = metadata_file["labels"]
+    columns = metadata_file["columns"]
+    target_values = columns.get(manifest["target_col"], [None] * len(labels))
+    metadata = [
+        {col: values[i] for col, values in columns.items()} if target_values[i] is not None else {}
+        for i in range(len(labels))
+    ]
+
+    pack = {
+        "version": version,
+        "manifest": manifest,
+        "feature_cols": vocab_file["feature_cols"],
+        "target_col": manifest["target_col"],
+        "vocab": {col: {v: code for code, v in enumerate(classes)} for col, classes in vocab_file["vocab"].items()},
+        "fallback_codes": np.asarray(vocab_file["fallback_codes"], dtype=np.int64),
+        "labels": np.asarray(labels),
+        "metadata": metadata,
+        "compiled_forest": forest,
+    }
+    if manifest.get("has_table"):
+        pack["table"] = {name: np.load(os.path.join(path, f"table_{name}.npy"), mmap_mode=mmap_mode)
+                         for name in TABLE_ARRAYS}
+    return pack
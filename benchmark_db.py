@@ -0,0 +1,116 @@
+"""
+Database Benchmark
+Runs admin-style reads (dashboard counts, the recommendations listing) and user writes
+(responses and saved recommendations) at the same time against a scratch database, once with a
+fresh default-journal connection per operation (the old per-route pattern) and once with db.py's
+per-thread WAL connections, and reports throughput, latency and lock errors for both.
+
+Run: python benchmark_db.py [--seconds 5] [--readers 4] [--writers 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import numpy as np
+import db
+
+SEED_USERS = 2000
+SEED_RECOMMENDATIONS = 20000
+
+READ_QUERIES = (
+    "SELECT COUNT(*) FROM users",
+    "SELECT COUNT(*) FROM recommendations WHERE saved = 1",
+    "SELECT pathway, COUNT(*) FROM recommendations WHERE saved = 1 GROUP BY pathway",
+    """SELECT r.id, u.username, r.pathway, r.recommendation_data, r.created_at
+       FROM recommendations r JOIN users u ON r.user_id = u.id
+       WHERE r.saved = 1 ORDER BY r.created_at DESC LIMIT 200""",
+)
+
+def seed(path):
+    db.init_db(path)
+    conn = db.open_connection(path)
+    with conn:
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                         [(f"user{i}@example.com", "x") for i in range(SEED_USERS)])
+        conn.executemany("INSERT INTO recommendations (user_id, pathway, recommendation_data, saved) VALUES (?, ?, ?, 1)",
+                         [(i % SEED_USERS + 1, ("career", "education", "tesda")[i % 3],
+                           str({"title": f"Program {i}", "match": 80.0})) for i in range(SEED_RECOMMENDATIONS)])
+    # back to a rollback journal so the legacy run really uses the default settings
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+
+def legacy_connect(path):
+    conn = sqlite3.connect(path)
+    return conn, conn.close
+
+def pooled_connect(path):
+    return db.connect(path), lambda: None
+
+def reader(path, connect, stop, timings, errors):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn, done = connect(path)
+            conn.execute(READ_QUERIES[i % len(READ_QUERIES)]).fetchall()
+            done()
+            timings.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors.append(1)
+        i += 1
+
+def writer(path, connect, stop, timings, errors):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn, done = connect(path)
+            conn.execute("INSERT INTO responses (user_id, pathway, responses) VALUES (?, ?, ?)",
+                         (i % SEED_USERS + 1, "career", str({"industry": "tech"})))
+            conn.commit()
+            done()
+            timings.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors.append(1)
+        i += 1
+
+def run(mode, connect, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path)
+        stop = threading.Event()
+        results = {"read": ([], []), "write": ([], [])}
+        threads = [threading.Thread(target=reader, args=(path, connect, stop) + results["read"]) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(path, connect, stop) + results["write"]) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    for kind, (timings, errors) in results.items():
+        ms = np.array(timings) * 1000 if timings else np.zeros(1)
+        print(f"{mode:<8} {kind:<6} {len(timings) / seconds:>9.0f} {np.percentile(ms, 50):>9.2f} "
+              f"{np.percentile(ms, 95):>9.2f} {ms.max():>9.1f} {len(errors):>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    print("\n" + "=" * 62)
+    print(f"{'mode':<8} {'op':<6} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>7}")
+    print("=" * 62)
+    run("legacy", legacy_connect, args.readers, args.writers, args.seconds)
+    run("pooled", pooled_connect, args.readers, args.writers, args.seconds)
+    print("=" * 62)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""
+Inference Benchmark
+Compares sklearn's RandomForestClassifier.predict_proba with the compiled NumPy forest
+for every pathway: checks the probabilities are identical, then times single-row and batch calls.
+
+Run after training: python benchmark_inference.py
+"""
+
+import time
+import numpy as np
+from ml_model import MLModel, ENGINES
+
+SINGLE_ROW_CALLS = 200
+BATCH_ROWS = 2000
+
+def time_calls(fn, n):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return np.median(timings), np.percentile(timings, 99)
+
+def all_inputs(pack):
+    """Every combination of training values, encoded, in table order"""
+    dims = [len(pack["vocab"][col]) for col in pack["feature_cols"]]
+    return np.stack(np.unravel_index(np.arange(int(np.prod(dims))), dims), axis=1)
+
+def main():
+    ml = MLModel()
+    # the pickles carry the sklearn estimators the compiled forest is compared against
+    ml.load_all(artifact_root=None)
+    if not ml.models:
+        print("No models found. Run: python train_model.py")
+        return 1
+
+    print("\n" + "=" * 70)
+    print(f"{'pathway':<10} {'engine':<9} {'1-row p50':>10} {'1-row p99':>10} {f'{BATCH_ROWS}-row':>10}  identical")
+    print("=" * 70)
+    for pathway, pack in ml.models.items():
+        codes = all_inputs(pack)
+        batch = codes[np.arange(BATCH_ROWS) % len(codes)]
+        row = codes[:1]
+
+        probs = {}
+        for engine in ENGINES:
+            ml.set_engine(pathway, engine)
+            probs[engine] = ml._model_proba(pack, codes)
+        identical = all(np.array_equal(probs["sklearn"], p) for p in probs.values())
+
+        for engine in ENGINES:
+            ml.set_engine(pathway, engine)
+            p50, p99 = time_calls(lambda: ml._model_proba(pack, row), SINGLE_ROW_CALLS)
+            batch_ms, _ = time_calls(lambda: ml._model_proba(pack, batch), 3)
+            print(f"{pathway:<10} {engine:<9} {p50:>8.2f}ms {p99:>8.2f}ms {batch_ms:>8.1f}ms  {identical}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+"""
+Query Plan Check
+Migrates a scratch database to the latest schema, fills it with enough rows for the planner to
+prefer the indexes, and runs EXPLAIN QUERY PLAN on the queries of app.py (from queries,
+pagination and user_search, the modules that run them) and on those the schema runs itself. Fails (exit code 1)
+if any of them scans a whole table or sorts in a temporary B-tree instead of using an index,
+so a schema or query change that loses an index is caught.
+
+Run: python check_query_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+import db
+import pagination
+import queries
+import user_search
+
+LIMIT = pagination.DEFAULT_PAGE_SIZE
+AFTER = ("2030-01-01 00:00:00", 5000)  # any cursor position: a later page of an admin list
+
+def admin_recommendation_pages():
+    """Every filter combination of the admin recommendations API, first and later pages"""
+    for pathway in (None, "career"):
+        for title in (None, "nurse"):
+            where, params = [queries.SAVED_FILTER], []
+            if pathway:
+                where.append(queries.PATHWAY_FILTER)
+                params.append(pathway)
+            if title:
+                where.append(queries.TITLE_FILTER)
+                params.append(title)
+            for after in (None, AFTER):
+                yield pagination.page_query(queries.ADMIN_RECOMMENDATIONS_SELECT, where, params, LIMIT, after, "r.")
+
+# (query, parameters) of the routes in app.py, taken from the modules that run them
+HOT_QUERIES = [
+    (queries.LOGIN_SQL, ("user1@example.com",)),
+    (queries.USER_ID_SQL, ("user1@example.com",)),
+    (queries.MY_RECOMMENDATIONS_SQL, (1,)),
+    (queries.REMOVE_RECOMMENDATION_SQL, (1, 1)),
+    (queries.DELETE_USER_SQL, (1,)),
+    (queries.DELETE_RECOMMENDATION_SQL, (1,)),
+    # admin users API (without search), first and later pages
+    pagination.page_query(queries.ADMIN_USERS_SELECT, [], [], LIMIT),
+    pagination.page_query(queries.ADMIN_USERS_SELECT, [], [], LIMIT, AFTER),
+    # admin user search, the prefix and contains tiers
+    (user_search.PREFIX_SQL, ("ana", "ana\U0010ffff", "ana", 0, LIMIT + 1)),
+    (user_search.CONTAINS_FTS_SQL, (user_search.fts_phrase("ana"), user_search.MAX_ID, 3, "ana", LIMIT + 1)),
+    (user_search.CONTAINS_SCAN_SQL, (user_search.like_pattern("an"), user_search.MAX_ID, 2, "an", LIMIT + 1)),
+] + list(admin_recommendation_pages())
+
+def schema_queries(conn):
+    """
+    Queries the schema runs on its own, read from the migrated database: the UPDATE/DELETE
+    statements of the triggers (OLD./NEW. values become parameters), and the child-row lookups
+    of every foreign key (ON DELETE CASCADE, and the check when a parent row goes away)
+    """
+    found = []
+    for (body,) in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'"):
+        body = body[body.upper().index("BEGIN") + len("BEGIN"):body.upper().rindex("END")]
+        for statement in body.split(";"):
+            statement = re.sub(r"\b(OLD|NEW)\.\w+", "?", statement.strip())
+            if statement.upper().startswith(("UPDATE", "DELETE")):
+                found.append((statement, (None,) * statement.count("?")))
+    tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        for fk in conn.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+            found.append((f"SELECT 1 FROM {table} WHERE {fk[3]} = ?", (1,)))
+    return found
+
+def problems_in_plan(plan):
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        # a full-text index lookup is reported as a SCAN of the virtual table
+        if (detail.startswith("SCAN") and "USING INDEX" not in detail and "COVERING INDEX" not in detail
+                and "VIRTUAL TABLE INDEX" not in detail):
+            problems.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+def seed(conn):
+    with conn:
+        conn.executemany("INSERT INTO users (username, password, created_at) VALUES (?, 'x', datetime('now', ?))",
+                         [(f"user{i}@example.com", f"-{i} minutes") for i in range(1000)])
+        conn.executemany("INSERT INTO recommendations (user_id, pathway, recommendation_data, saved, created_at) "
+                         "VALUES (?, ?, '{}', ?, datetime('now', ?))",
+                         [(i % 1000 + 1, ("career", "education", "tesda")[i % 3], i % 4 != 0, f"-{i} minutes")
+                          for i in range(10000)])
+        conn.executemany("INSERT INTO responses (user_id, pathway, responses) VALUES (?, 'career', '{}')",
+                         [(i % 1000 + 1,) for i in range(10000)])
+    conn.execute("ANALYZE")
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plans.db")
+        version = db.init_db(path)
+        conn = db.open_connection(path)
+        seed(conn)
+        print(f"Schema version {version}")
+        checked = HOT_QUERIES + schema_queries(conn)
+        for sql, params in checked:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            problems = problems_in_plan(plan)
+            status = "FAIL" if problems else "ok"
+            print(f"[{status:>4}] {' '.join(sql.split())[:90]}")
+            for row in plan:
+                print(f"         {row[-1]}")
+            failed += bool(problems)
+        conn.close()
+    print(f"\n{failed} of {len(checked)} queries without a usable index")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import numpy as np
+
+class CompiledForest:
+    """
+    RandomForestClassifier flattened into contiguous node arrays and evaluated with NumPy.
+
+    All trees share one set of arrays; leaves point back to themselves so every tree can be
+    stepped max_depth times without branching on "is this a leaf". predict_proba averages the
+    leaf class distributions in tree order, the same way sklearn accumulates them, so the
+    probabilities are bit-for-bit equal to RandomForestClassifier.predict_proba.
+    """
+
+    # Up to this many rows, gather every tree's leaf distribution at once and sum over trees;
+    # above it the (n_trees, n_rows, n_classes) gather costs more than adding tree by tree.
+    GATHER_MAX_ROWS = 32
+
+    def __init__(self, feature, threshold, left, right, leaf_slot, leaf_values, roots, max_depth):
+        self.feature = feature          # (n_nodes,) split feature, 0 on leaves
+        self.threshold = threshold      # (n_nodes,) split threshold, go left when x <= threshold
+        self.left = left                # (n_nodes,) global index of left child, self on leaves
+        self.right = right              # (n_nodes,) global index of right child, self on leaves
+        self.leaf_slot = leaf_slot      # (n_nodes,) row in leaf_values, -1 on internal nodes
+        self.leaf_values = leaf_values  # (n_leaves, n_classes) class probabilities per leaf
+        self.roots = roots              # (n_trees,) global index of each tree's root
+        self.max_depth = int(max_depth)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([left, right], axis=1).ravel()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, slots, values, roots = [], [], [], [], [], [], []
+        node_offset = 0
+        leaf_offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            local = np.arange(n)
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            lefts.append((np.where(is_leaf, local, tree.children_left) + node_offset).astype(np.int32))
+            rights.append((np.where(is_leaf, local, tree.children_right) + node_offset).astype(np.int32))
+
+            slot = np.full(n, -1, dtype=np.int32)
+            slot[is_leaf] = np.arange(is_leaf.sum()) + leaf_offset
+            slots.append(slot)
+
+            proba = tree.value[is_leaf, 0, :model.n_classes_]
+            # sklearn >= 1.4 stores class fractions in tree_.value, older versions store counts
+            if not np.allclose(proba.sum(axis=1), 1.0):
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba = proba / normalizer
+            values.append(proba)
+
+            roots.append(node_offset)
+            node_offset += n
+            leaf_offset += int(is_leaf.sum())
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds),
+            np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(slots), np.concatenate(values),
+            np.asarray(roots, dtype=np.int32), max_depth
+        )
+
+    @property
+    def n_classes(self):
+        return self.leaf_values.shape[1]
+
+    def apply(self, X):
+        """Leaf slot reached in every tree: int array of shape (n_trees, n_rows)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        row_base = (np.arange(X.shape[0]) * X.shape[1])[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_right = flat.take(row_base + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return self.leaf_slot.take(nodes)
+
+    def predict_proba(self, X):
+        """
+        X: (n_rows, n_features) encoded feature matrix
+        returns: (n_rows, n_classes) probabilities, matching RandomForestClassifier.predict_proba
+        """
+        leaves = self.apply(X)
+        n_trees, n_rows = leaves.shape
+        if n_rows <= self.GATHER_MAX_ROWS:
+            # summing over the leading axis accumulates tree by tree, in estimator order
+            out = self.leaf_values[leaves].sum(axis=0)
+        else:
+            out = np.zeros((n_rows, self.n_classes))
+            for tree_leaves in leaves:
+                out += self.leaf_values[tree_leaves]
+        out /= n_trees
+        return out
@@ -0,0 +1,409 @@
+"""
+SQLite connection management.
+
+Every thread keeps one open connection to the database (gunicorn threads, the response writer)
+instead of connecting per request, and every connection is set up the same way:
+
+- WAL journal: readers see the last committed snapshot and never block the writer, and the
+  writer never blocks readers (only writers still take turns).
+- synchronous=NORMAL: in WAL mode a commit no longer fsyncs; the WAL is synced at checkpoints.
+  A power loss can drop the last commits but never corrupts the database.
+- a larger page cache and memory-mapped reads, temp tables in memory, and a busy timeout so a
+  writer waits for the lock instead of failing with "database is locked".
+
+- foreign keys enforced (deleting a user cascades to their responses and recommendations).
+
+connect() hands out the calling thread's connection; calling close() on it only rolls back
+whatever was left uncommitted, so the routes keep their connect/commit/close shape.
+release() does the same at the end of every request (see app.teardown_appcontext).
+
+The schema is versioned with PRAGMA user_version: init_db() applies every migration in
+MIGRATIONS the database hasn't seen yet, each in its own transaction, then runs PRAGMA optimize.
+
+The counters table holds row counts (users; recommendations per pathway and saved flag) kept
+current by triggers, so the admin pages don't count the tables on every load. If it ever drifts
+(e.g. after editing the database by hand with triggers dropped):
+
+    python db.py rebuild-counters
+
+Likewise users_fts, the trigram index behind the admin user search: python db.py rebuild-search
+"""
+
+import os
+import sqlite3
+import threading
+import recommendation_codec
+
+DB_PATH = os.environ.get('DATABASE_PATH', 'education_system.db')
+
+BUSY_TIMEOUT_MS = 10000
+CACHE_SIZE_KB = 16 * 1024   # per connection
+MMAP_SIZE = 64 * 1024 * 1024
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+class ThreadConnection(sqlite3.Connection):
+    """A connection owned by one thread and reused by every request that thread serves"""
+
+    def close(self):
+        # keep the connection, just don't let an unfinished transaction leak into the next request
+        if self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        super().close()
+
+_local = threading.local()
+
+def open_connection(path=DB_PATH, factory=sqlite3.Connection):
+    """A new, configured connection (callers own it)"""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, factory=factory)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def connect(path=DB_PATH):
+    """The calling thread's connection to path, opened on first use"""
+    conns = getattr(_local, "conns", None)
+    if conns is None or _local.pid != os.getpid():
+        # never reuse a connection inherited across fork()
+        conns = _local.conns = {}
+        _local.pid = os.getpid()
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = open_connection(path, factory=ThreadConnection)
+    return conn
+
+def release(exc=None):
+    """Roll back anything the current request left uncommitted on this thread's connections"""
+    if getattr(_local, "pid", None) != os.getpid():
+        return
+    for conn in _local.conns.values():
+        conn.close()
+
+# Recount the counters table from the tables themselves (see rebuild_counters)
+REBUILD_COUNTERS_SQL = [
+    "DELETE FROM counters",
+    "INSERT INTO counters (entity, value) SELECT 'users', COUNT(*) FROM users",
+    '''INSERT INTO counters (entity, pathway, saved, value)
+       SELECT 'recommendations', COALESCE(pathway, ''), CASE WHEN saved THEN 1 ELSE 0 END, COUNT(*)
+       FROM recommendations GROUP BY 2, 3''',
+]
+
+# Reindex every username in users_fts
+REBUILD_SEARCH_SQL = "INSERT INTO users_fts (users_fts) VALUES ('rebuild')"
+
+# (version, description, statements); append new migrations, never edit applied ones.
+# A statement is SQL, or a function(conn) for data changes that need Python.
+MIGRATIONS = [
+    (1, "base schema", [
+        # Users table
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        # Responses table
+        '''CREATE TABLE IF NOT EXISTS responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            pathway TEXT,
+            responses TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )''',
+        # Recommendations table
+        '''CREATE TABLE IF NOT EXISTS recommendations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            pathway TEXT,
+            recommendation_data TEXT,
+            saved BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )''',
+    ]),
+    # SQLite can't alter a foreign key, so both child tables are rebuilt; rows of users that
+    # no longer exist (or of no user) can't be kept, and are moved to orphaned_<table> first
+    (2, "foreign keys ON DELETE CASCADE", [
+        lambda conn: quarantine_orphans(conn, "responses"),
+        lambda conn: quarantine_orphans(conn, "recommendations"),
+        '''CREATE TABLE responses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            pathway TEXT,
+            responses TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )''',
+        '''INSERT INTO responses_new (id, user_id, pathway, responses, created_at)
+           SELECT id, user_id, pathway, responses, created_at FROM responses
+           WHERE user_id IN (SELECT id FROM users)''',
+        # keep the AUTOINCREMENT counter, so ids of deleted rows are never handed out again
+        "DELETE FROM sqlite_sequence WHERE name = 'responses_new'",
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'responses_new', seq FROM sqlite_sequence WHERE name = 'responses'",
+        "DROP TABLE responses",
+        "ALTER TABLE responses_new RENAME TO responses",
+        '''CREATE TABLE recommendations_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            pathway TEXT,
+            recommendation_data TEXT,
+            saved BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )''',
+        '''INSERT INTO recommendations_new (id, user_id, pathway, recommendation_data, saved, created_at)
+           SELECT id, user_id, pathway, recommendation_data, saved, created_at FROM recommendations
+           WHERE user_id IN (SELECT id FROM users)''',
+        # keep the AUTOINCREMENT counter, so ids of deleted rows are never handed out again
+        "DELETE FROM sqlite_sequence WHERE name = 'recommendations_new'",
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'recommendations_new', seq FROM sqlite_sequence WHERE name = 'recommendations'",
+        "DROP TABLE recommendations",
+        "ALTER TABLE recommendations_new RENAME TO recommendations",
+    ]),
+    (3, "indexes for the per-user and admin queries", [
+        # my_recommendations, remove_recommendation, and the cascade from users
+        "CREATE INDEX IF NOT EXISTS idx_recommendations_user ON recommendations (user_id, saved, created_at)",
+        # admin dashboard counts and per-pathway stats (covering), pathway-filtered listing in order
+        "CREATE INDEX IF NOT EXISTS idx_recommendations_saved_pathway ON recommendations (saved, pathway, created_at)",
+        # unfiltered admin listing, newest first
+        "CREATE INDEX IF NOT EXISTS idx_recommendations_saved_created ON recommendations (saved, created_at)",
+        # the cascade from users
+        "CREATE INDEX IF NOT EXISTS idx_responses_user ON responses (user_id, created_at)",
+        # admin user list, newest first
+        "CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)",
+        "ANALYZE",
+    ]),
+    # row counts for the admin pages, kept current by triggers in the writer's own transaction
+    (4, "trigger-maintained counters", [
+        '''CREATE TABLE IF NOT EXISTS counters (
+            entity TEXT NOT NULL,
+            pathway TEXT NOT NULL DEFAULT '',
+            saved INTEGER NOT NULL DEFAULT 0,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (entity, pathway, saved)
+        ) WITHOUT ROWID''',
+        '''CREATE TRIGGER IF NOT EXISTS counters_users_insert AFTER INSERT ON users BEGIN
+            INSERT INTO counters (entity, value) VALUES ('users', 1)
+            ON CONFLICT DO UPDATE SET value = value + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS counters_users_delete AFTER DELETE ON users BEGIN
+            UPDATE counters SET value = value - 1 WHERE entity = 'users' AND pathway = '' AND saved = 0;
+        END''',
+        # deleting a user fires the recommendations trigger for every row the cascade removes
+        '''CREATE TRIGGER IF NOT EXISTS counters_recommendations_insert AFTER INSERT ON recommendations BEGIN
+            INSERT INTO counters (entity, pathway, saved, value)
+            VALUES ('recommendations', COALESCE(NEW.pathway, ''), CASE WHEN NEW.saved THEN 1 ELSE 0 END, 1)
+            ON CONFLICT DO UPDATE SET value = value + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS counters_recommendations_delete AFTER DELETE ON recommendations BEGIN
+            UPDATE counters SET value = value - 1
+            WHERE entity = 'recommendations' AND pathway = COALESCE(OLD.pathway, '')
+              AND saved = CASE WHEN OLD.saved THEN 1 ELSE 0 END;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS counters_recommendations_update AFTER UPDATE OF pathway, saved ON recommendations BEGIN
+            UPDATE counters SET value = value - 1
+            WHERE entity = 'recommendations' AND pathway = COALESCE(OLD.pathway, '')
+              AND saved = CASE WHEN OLD.saved THEN 1 ELSE 0 END;
+            INSERT INTO counters (entity, pathway, saved, value)
+            VALUES ('recommendations', COALESCE(NEW.pathway, ''), CASE WHEN NEW.saved THEN 1 ELSE 0 END, 1)
+            ON CONFLICT DO UPDATE SET value = value + 1;
+        END''',
+    ] + REBUILD_COUNTERS_SQL),
+    (5, "structured recommendation storage", [
+        "ALTER TABLE recommendations ADD COLUMN title TEXT",
+        "ALTER TABLE recommendations ADD COLUMN match_score REAL",
+        lambda conn: backfill_recommendations(conn),
+    ]),
+    # admin user search (see user_search): trigram full-text index of usernames, plus an index for
+    # prefix matches
+    (6, "user search index", [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            username, content='users', content_rowid='id', tokenize='trigram'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, username) VALUES (NEW.id, NEW.username);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', OLD.id, OLD.username);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', OLD.id, OLD.username);
+            INSERT INTO users_fts (rowid, username) VALUES (NEW.id, NEW.username);
+        END''',
+        REBUILD_SEARCH_SQL,
+        "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users (lower(username))",
+        "ANALYZE users",
+    ]),
+    # background jobs (see job_runner)
+    (7, "jobs", [
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            pathway TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            runner_pid INTEGER,
+            pid INTEGER,
+            exit_code INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)",
+    ]),
+    # retrain even if the training inputs are unchanged (train_model.py --force)
+    (8, "jobs.force", [
+        "ALTER TABLE jobs ADD COLUMN force INTEGER NOT NULL DEFAULT 0",
+    ]),
+    # which process runs / trains a job, beyond its pid (pids are reused, e.g. after a restart)
+    (9, "jobs process identity", [
+        "ALTER TABLE jobs ADD COLUMN runner_identity TEXT",
+        "ALTER TABLE jobs ADD COLUMN pid_identity TEXT",
+    ]),
+]
+
+def quarantine_orphans(conn, table):
+    """Copy the rows of table whose user_id doesn't match a user to orphaned_<table>; prints how many"""
+    where = "user_id IS NULL OR user_id NOT IN (SELECT id FROM users)"
+    count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}").fetchone()[0]
+    if count:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS orphaned_{table} AS SELECT * FROM {table} WHERE 0")
+        conn.execute(f"INSERT INTO orphaned_{table} SELECT * FROM {table} WHERE {where}")
+        print(f"Migration: moved {count} {table} rows without a user to orphaned_{table}")
+
+def backfill_recommendations(conn, batch_size=1000):
+    """Rewrite str(dict) recommendation rows as JSON and fill in title and match_score"""
+    last_id = 0
+    while True:
+        rows = conn.execute("SELECT id, recommendation_data FROM recommendations WHERE id > ? ORDER BY id LIMIT ?",
+                            (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        conn.executemany("UPDATE recommendations SET recommendation_data = ?, title = ?, match_score = ? WHERE id = ?",
+                         [recommendation_codec.legacy_columns(text) + (rec_id,) for rec_id, text in rows])
+        last_id = rows[-1][0]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(path=DB_PATH):
+    """Bring the database at path up to the latest schema version; returns the version"""
+    conn = open_connection(path)
+    conn.isolation_level = None  # transactions are managed explicitly below
+    # off while tables are rebuilt (can't be changed inside a transaction); checked before each commit
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version, description, statements in MIGRATIONS:
+            # IMMEDIATE: another process migrating at the same time waits here, then sees the new version
+            conn.execute("BEGIN IMMEDIATE")
+            if schema_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                continue
+            existing = set(conn.execute("PRAGMA foreign_key_check").fetchall())
+            for sql in statements:
+                if callable(sql):
+                    sql(conn)
+                else:
+                    conn.execute(sql)
+            # orphans older than the migration (e.g. before foreign keys were enforced) are left to
+            # the migration that cleans them up; a migration must not add any
+            violations = [v for v in conn.execute("PRAGMA foreign_key_check").fetchall() if tuple(v) not in existing]
+            if violations:
+                raise sqlite3.IntegrityError(f"migration {version} leaves foreign key violations: {violations[:5]}")
+            conn.execute(f"PRAGMA user_version={version}")
+            conn.execute("COMMIT")
+            print(f"Database migrated to version {version}: {description}")
+        conn.execute("PRAGMA optimize")
+        return schema_version(conn)
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def optimize(path=DB_PATH):
+    """PRAGMA optimize: refresh the planner statistics that have gone stale (cheap when nothing has)"""
+    conn = open_connection(path)
+    try:
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+def counters(conn):
+    """
+    Row counts from the counters table (a handful of rows, however large the tables get):
+    {'users': n, 'saved': {pathway: n}, 'total': {pathway: n}}
+    """
+    counts = {'users': 0, 'saved': {}, 'total': {}}
+    for entity, pathway, saved, value in conn.execute("SELECT entity, pathway, saved, value FROM counters"):
+        if entity == 'users':
+            counts['users'] = value
+        elif entity == 'recommendations':
+            counts['total'][pathway] = counts['total'].get(pathway, 0) + value
+            if saved:
+                counts['saved'][pathway] = value
+    return counts
+
+def rebuild_counters(path=DB_PATH):
+    """Recount the counters table from scratch; returns {(entity, pathway, saved): (old, new)} for every drifted counter"""
+    conn = open_connection(path)
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # no writes between reading the old values and recounting
+        query = "SELECT entity, pathway, saved, value FROM counters"
+        old = {tuple(row[:3]): row[3] for row in conn.execute(query)}
+        for sql in REBUILD_COUNTERS_SQL:
+            conn.execute(sql)
+        new = {tuple(row[:3]): row[3] for row in conn.execute(query)}
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return {key: (old.get(key, 0), new.get(key, 0))
+            for key in sorted(set(old) | set(new)) if old.get(key, 0) != new.get(key, 0)}
+
+def rebuild_search(path=DB_PATH):
+    """Rebuild the user search index from users"""
+    conn = open_connection(path)
+    try:
+        with conn:
+            conn.execute(REBUILD_SEARCH_SQL)
+    finally:
+        conn.close()
+
+def init_db(path=DB_PATH):
+    """Create the tables if they don't exist yet, and apply any pending migration"""
+    return migrate(path)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Database maintenance")
+    parser.add_argument("command", choices=["migrate", "optimize", "rebuild-counters", "rebuild-search"])
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: %(default)s)")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        print(f"Schema version {migrate(args.db)}")
+    elif args.command == "optimize":
+        optimize(args.db)
+    elif args.command == "rebuild-search":
+        rebuild_search(args.db)
+    else:
+        drift = rebuild_counters(args.db)
+        for (entity, pathway, saved), (old, new) in drift.items():
+            print(f"{entity} {pathway or '-'} saved={saved}: {old} -> {new}")
+        print(f"{len(drift)} counters corrected")
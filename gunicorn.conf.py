@@ -0,0 +1,49 @@
+"""
+Production gunicorn profile: gunicorn -c gunicorn.conf.py app:app
+
+The app (and with it all three ML models) is imported once in the master and the workers are
+forked from it, so they share the loaded models copy-on-write instead of each building its own.
+To keep those pages shared, the garbage collector is kept off while the app loads and everything
+allocated so far is moved to the permanent generation (gc.freeze) right before forking: otherwise
+a collection in a worker writes GC headers on every object and unshares the pages.
+"""
+
+import gc
+import multiprocessing
+import os
+import db
+import memstats
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+preload_app = True
+
+# This file is executed before the app is preloaded; no collections while the models load
+gc.disable()
+
+def when_ready(server):
+    # App is loaded, workers are about to be forked
+    gc.freeze()
+    gc.enable()
+    server.log.info("Preloaded app; froze %d objects out of the GC", gc.get_freeze_count())
+
+def pre_fork(server, worker):
+    # also covers workers respawned later; freezing again only moves what was allocated since
+    gc.freeze()
+
+def post_worker_init(worker):
+    mem = memstats.process_memory(os.getpid())
+    if mem:
+        worker.log.info("Worker %s ready: RSS %.1f MB, USS %.1f MB",
+                        os.getpid(), mem["rss_kb"] / 1024, mem["uss_kb"] / 1024)
+
+def worker_exit(server, worker):
+    # write the answers still queued in this worker before it goes away
+    from app import response_writer, job_runner
+    response_writer.close()
+    # retrain jobs started by this worker can't be watched once it's gone
+    job_runner.close()
+    # refresh planner statistics that went stale while this worker was running
+    db.optimize()
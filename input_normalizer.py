@@ -0,0 +1,243 @@
+"""
+Normalization of questionnaire answers into model feature values.
+
+Each pathway is described declaratively as a list of Fields (which form answer feeds which feature
+column, how free-form answers map onto training values, and the default). The tables are built
+once at import; normalize() is a dict lookup per field, and normalize_frame() does the same for a
+whole DataFrame of answers (each distinct answer is resolved once) for bulk scoring.
+validate() checks the tables against the encoder vocabulary of the loaded models.
+"""
+
+import pandas as pd
+from keyword_scorer import KeywordScorer
+
+class Field:
+    def __init__(self, feature, source=None, mapping=None, valid=(), default="", partial_match=False, passthrough=False):
+        """
+        feature: model feature column; source: form field it is read from (defaults to feature)
+        mapping: answer -> training value; answers in valid are used as they are
+        default: value for anything else
+        partial_match: otherwise use the first mapping key contained in the answer (or containing it)
+        passthrough: use the answer as it is, without validation
+        """
+        self.feature = feature
+        self.source = source or feature
+        self.mapping = dict(mapping or {})
+        self.valid = list(valid)
+        self.default = default
+        self.partial_match = partial_match
+        self.passthrough = passthrough
+        # answers in mapping win over the same answer in valid
+        self._table = {value: value for value in self.valid}
+        self._table.update(self.mapping)
+        if partial_match:
+            self._keys = list(self.mapping)
+            # key contained in the answer: one pass over the answer with an automaton of all keys
+            self._key_matcher = KeywordScorer({"keys": self._keys}, {})
+            # answer contained in a key: every substring of every key, pointing at the first such key
+            self._key_substrings = {}
+            for idx, key in enumerate(self._keys):
+                for start in range(len(key) + 1):
+                    for end in range(start, len(key) + 1):
+                        self._key_substrings.setdefault(key[start:end], idx)
+
+    def targets(self):
+        """Every value this field can produce (except passthrough answers)"""
+        return set(self._table.values()) | {self.default}
+
+    def lookup(self, answer):
+        """Training value for one raw answer"""
+        answer = str(answer if answer is not None else "").lower().strip()
+        if self.passthrough:
+            return answer
+        value = self._table.get(answer)
+        if value is not None:
+            return value
+        if self.partial_match:
+            candidates = self._key_matcher.matches(answer)
+            if answer in self._key_substrings:
+                candidates.add(self._key_substrings[answer])
+            if candidates:
+                return self.mapping[self._keys[min(candidates)]]
+        return self.default
+
+FIELDS = {
+    'career': [
+        # Skills mapping - map form values to dataset values
+        Field('primary_skills', mapping={
+            'communication': 'communication',
+            'problem-solving': 'problem-solving',
+            'problem solving': 'problem-solving',
+            'technical': 'technical',
+            'leadership': 'leadership',  # Leadership exists in dataset
+            'creativity': 'creativity',  # Creativity exists in dataset
+            'analytical': 'problem-solving',
+            'organization': 'communication',
+            'teamwork': 'communication',
+            'customer service': 'service',
+            'sales': 'service',
+            'hands-on': 'hands-on',
+            'hands on': 'hands-on',
+            'service': 'service',
+            'creative': 'creativity',
+            'ui/ux': 'design',
+            'design': 'design',
+            'art': 'creativity'
+        }, default='communication', partial_match=True),
+        # Industry mapping - form values to dataset values
+        Field('industry', mapping={
+            'tech': 'tech',
+            'technology/it': 'tech',
+            'business': 'business',
+            'business/sales': 'business',
+            'health': 'health',
+            'healthcare': 'health',
+            'education': 'education',
+            'creative': 'creative',
+            'creative/arts': 'creative',
+            'service': 'service',
+            'service industry': 'service',
+            'trade': 'trade',
+            'skilled trades': 'trade',
+            'government': 'business',  # Map to closest match
+            'finance': 'business',
+            'finance/banking': 'business'
+        }, valid=['tech', 'business', 'health', 'education', 'creative', 'service', 'trade'], default='tech'),
+        # Salary mapping - form values to dataset format
+        Field('salary', mapping={
+            '15k-25k': '60k-80k',  # Map to entry-level range
+            '25k-40k': '65k-85k',
+            '40k-60k': '70k-90k',
+            '60k+': '80k-120k',
+            '30k-50k': '60k-80k',
+            '50k-70k': '70k-90k',
+            '70k-90k': '70k-90k',
+            '80k+': '80k-120k'
+        }, valid=['60k-80k', '65k-85k', '70k-90k', '75k-95k', '80k-110k', '80k-120k', '90k-130k'], default='60k-80k'),
+        # Work environment mapping
+        Field('work_environment', mapping={
+            'office': 'office',
+            'office-based': 'office',
+            'remote': 'remote',
+            'remote/work from home': 'remote',
+            'field': 'field',
+            'field work': 'field',
+            'hybrid': 'hybrid',
+            'outdoor': 'outdoor'
+        }, valid=['office', 'remote', 'hybrid', 'field', 'outdoor'], default='office'),
+    ],
+    'education': [
+        # Modality mapping - from form field "learning_modality"
+        Field('modality', 'learning_modality', mapping={
+            'face_to_face': 'full_time',
+            'face-to-face': 'full_time',
+            'online': 'online',
+            'hybrid': 'hybrid',
+            'flexible': 'flexible',
+            'flexible schedule': 'flexible'
+        }, valid=['full_time', 'online', 'hybrid', 'flexible'], default='full_time'),
+        # Budget mapping - from form field "duration"
+        Field('budget', 'duration', mapping={
+            'short_term': 'low',
+            'short-term': 'low',
+            'medium_term': 'medium',
+            'medium-term': 'medium',
+            'long_term': 'high',
+            'long-term': 'high',
+            'flexible': 'medium',
+            'flexible/self-paced': 'medium'
+        }, valid=['low', 'medium', 'high'], default='medium'),
+        # Learning style - default to kinesthetic if not provided
+        Field('learning_style', valid=['kinesthetic', 'visual', 'auditory', 'reading'], default='kinesthetic'),
+        # Motivation - default to career-focused
+        Field('motivation', valid=['career-focused', 'personal-growth', 'academic'], default='career-focused'),
+        # Field of interest - IMPORTANT: Include this for ML model prediction
+        # When no field is selected it stays "" ("any field"), so we get diverse results
+        Field('field', 'field_of_interest', passthrough=True),
+    ],
+    'tesda': [
+        # Budget mapping - training duration to budget
+        Field('budget', mapping={
+            'short': 'free',
+            'short-term': 'free',
+            'medium': 'paid',  # TESDA uses 'paid' not 'low'
+            'medium-term': 'paid',
+            'long': 'paid',
+            'long-term': 'paid',
+            'flexible': 'free',
+            'flexible/self-paced': 'free'
+        }, valid=['free', 'paid'], default='free'),
+        # Time available mapping - schedule to time_available
+        Field('time_available', mapping={
+            'full_time': 'full_time',
+            'full-time': 'full_time',
+            'weekdays': 'full_time',
+            'weekends': 'part_time',
+            'weekends only': 'part_time',
+            'evenings': 'part_time',
+            'flexible': 'flexible',
+            'flexible schedule': 'flexible'
+        }, valid=['full_time', 'part_time', 'flexible'], default='part_time'),
+        # Location - default to manila if not provided
+        Field('location', mapping={
+            'manila': 'manila',
+            'makati': 'makati',
+            'quezon city': 'quezon_city',
+            'quezon_city': 'quezon_city',
+            'pasig': 'manila',  # Map to closest
+            'taguig': 'makati',
+            'mandaluyong': 'makati'
+        }, valid=['manila', 'makati', 'quezon_city'], default='manila'),
+        # Experience mapping
+        Field('experience', mapping={
+            'none': 'beginner',
+            'no experience': 'beginner',
+            'basic': 'beginner',
+            'basic knowledge': 'beginner',
+            'intermediate': 'intermediate',
+            'some experience': 'intermediate',
+            'advanced': 'advanced',
+            'highly experienced': 'advanced'
+        }, valid=['beginner', 'intermediate', 'advanced'], default='beginner'),
+    ],
+}
+
+def normalize(pathway, responses):
+    """Map frontend answers to model feature values ({} for an unknown pathway)"""
+    return {field.feature: field.lookup(responses.get(field.source, "")) for field in FIELDS.get(pathway, [])}
+
+def normalize_frame(pathway, answers):
+    """
+    normalize() for a DataFrame with one row of answers per profile (missing columns count as
+    unanswered); returns a DataFrame with the feature columns, ready for predict_top_k_batch
+    """
+    features = {}
+    for field in FIELDS.get(pathway, []):
+        if field.source in answers:
+            raw = answers[field.source].fillna("").astype(str).str.lower().str.strip()
+        else:
+            raw = pd.Series("", index=answers.index)
+        resolved = {answer: field.lookup(answer) for answer in raw.unique()}
+        features[field.feature] = raw.map(resolved)
+    return pd.DataFrame(features, index=answers.index)
+
+def validate(models):
+    """
+    Check the normalizer tables against the loaded models: every feature column is normalized and
+    every value a field can produce is in the model's encoder vocabulary.
+    models: {pathway: pack}; returns a list of problems (empty if everything matches)
+    """
+    problems = []
+    for pathway, pack in models.items():
+        fields = {field.feature: field for field in FIELDS.get(pathway, [])}
+        for col in pack["feature_cols"]:
+            field = fields.get(col)
+            if field is None:
+                problems.append(f"{pathway}: no normalizer for feature '{col}'")
+            elif not field.passthrough:
+                unknown = sorted(field.targets() - set(pack["vocab"][col]))
+                if unknown:
+                    problems.append(f"{pathway}.{col}: values not seen in training: {', '.join(unknown)}")
+        for col in sorted(set(fields) - set(pack["feature_cols"])):
+            problems.append(f"{pathway}: '{col}' is not a feature of the model")
+    return problems
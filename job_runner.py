@@ -0,0 +1,316 @@
+"""
+Background jobs (model retraining) for the admin panel.
+
+/admin/retrain used to run train_model.py inside the request, holding a gunicorn worker (and
+risking its timeout) for the whole retrain. JobRunner.submit() only records the job in the jobs
+table and returns; a dispatcher thread starts queued jobs as separate processes (at a lower CPU
+priority, so serving stays responsive) and records how they ended. Output goes to a log file per
+job, so /admin/jobs/<id> can be polled for status and log while it runs.
+
+Jobs are claimed with a single UPDATE on the shared database, so across all gunicorn workers at
+most max_concurrent jobs run at once, and never two that train the same pathway. Jobs left
+'running' by a worker that has since gone away are marked failed the next time a dispatcher
+starts. Like the response writer, each process starts its own dispatcher thread on first use.
+
+train_model.py trains in a process pool, so a job is started in a session (process group) of its
+own, and stopping it signals the whole group: killing only the parent would leave the pool
+workers running, and they could still publish a version after the job was marked failed.
+
+Pids are reused (a restarted container starts counting again), so a job also records the identity
+(boot id and start time) of the process running it and of its training process. A job is only
+considered orphaned, and a process group only signalled, when those identities say so.
+"""
+
+import atexit
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import db
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAIN_SCRIPT = os.path.join(BASE_DIR, "train_model.py")
+# jobs run at a lower CPU priority (inherited by the training pool); a prefix rather than a
+# preexec_fn, which isn't safe in a multi-threaded gunicorn worker
+NICE_PREFIX = ["nice", "-n", "10"] if shutil.which("nice") else []
+
+# Picks the oldest queued job that doesn't train a pathway being trained right now ('all' trains
+# every pathway), unless max_concurrent jobs are running already
+CLAIM_SQL = """UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP, runner_pid = ?,
+    runner_identity = ?
+    WHERE id = (
+        SELECT q.id FROM jobs q WHERE q.status = 'queued' AND NOT EXISTS (
+            SELECT 1 FROM jobs r WHERE r.status = 'running'
+              AND (r.pathway = q.pathway OR r.pathway = 'all' OR q.pathway = 'all'))
+        ORDER BY q.id LIMIT 1)
+    AND (SELECT COUNT(*) FROM jobs WHERE status = 'running') < ?
+    RETURNING id, kind, pathway, force"""
+
+FINISH_SQL = """UPDATE jobs SET status = ?, exit_code = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+    WHERE id = ?"""
+
+JOB_COLUMNS = ("id", "kind", "pathway", "force", "status", "exit_code", "error",
+               "created_at", "started_at", "finished_at")
+
+class JobRunner:
+    def __init__(self, db_path=db.DB_PATH, log_dir=os.path.join(BASE_DIR, "job_logs"), max_concurrent=1,
+                 timeout=3600, poll_interval=1.0, on_finish=None):
+        """
+        max_concurrent: jobs running at once, across all processes sharing the database
+        timeout: seconds before a job is killed and marked failed
+        on_finish: on_finish(job) called in the dispatcher thread after a job of this process ends
+        """
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.on_finish = on_finish
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._children = {}   # job id -> (Popen, start time, job dict), this process only
+        self._wake = threading.Event()
+        atexit.register(self.close)
+
+    # ---- requests ----
+
+    def submit(self, pathway, kind="retrain", force=False):
+        """
+        Queue a job (or return the one already queued for the same pathway); returns the job dict.
+        force: retrain even if the pathway's training inputs are unchanged
+        """
+        conn = db.connect(self.db_path)
+        with conn:
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' AND kind = ? AND pathway = ?",
+                               (kind, pathway)).fetchone()
+            if row is None:
+                job_id = conn.execute("INSERT INTO jobs (kind, pathway, force) VALUES (?, ?, ?)",
+                                      (kind, pathway, int(force))).lastrowid
+            else:
+                job_id = row[0]
+                if force:
+                    conn.execute("UPDATE jobs SET force = 1 WHERE id = ?", (job_id,))
+        self._ensure_started()
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """The job as a dict (None if there is no such job)"""
+        row = db.connect(self.db_path).execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        if job["status"] == QUEUED:
+            # e.g. queued before a restart: make sure some dispatcher is looking at the queue
+            self._ensure_started()
+        return job
+
+    def recent(self, limit=20):
+        rows = db.connect(self.db_path).execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def log_path(self, job_id):
+        return os.path.join(self.log_dir, f"job-{job_id}.log")
+
+    def read_log(self, job_id, offset=0, max_bytes=64 * 1024):
+        """(text, next offset) of the job's log from offset on"""
+        try:
+            with open(self.log_path(job_id), "rb") as f:
+                f.seek(max(0, offset))
+                data = f.read(max_bytes)
+        except FileNotFoundError:
+            return "", offset
+        return data.decode("utf-8", errors="replace"), max(0, offset) + len(data)
+
+    # ---- dispatcher ----
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._children = {}  # a forked copy doesn't own its parent's processes
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        self._recover()
+        while True:
+            finished = []
+            try:
+                with self._lock:
+                    finished = self._reap()
+                    self._claim()
+            except Exception as e:
+                print(f"Job runner: {e}")
+            for job in finished:
+                self._notify(job)
+            with self._lock:
+                # stop when there is nothing left to run or watch; submit() starts a new thread
+                if not self._children and not self._queued():
+                    self._thread = None
+                    return
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _queued(self):
+        return db.connect(self.db_path).execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone() is not None
+
+    def _claim(self):
+        conn = db.connect(self.db_path)
+        while True:
+            with conn:
+                rows = conn.execute(CLAIM_SQL, (os.getpid(), _identity(os.getpid()), self.max_concurrent)).fetchall()
+            if not rows:
+                return
+            job = dict(zip(("id", "kind", "pathway", "force"), rows[0]))
+            try:
+                self._start(job)
+            except Exception as e:
+                self._finish(job, FAILED, None, f"could not start: {e}")
+
+    def _command(self, job):
+        command = NICE_PREFIX + [sys.executable, TRAIN_SCRIPT]
+        if job["pathway"] != "all":
+            command += ["--pathway", job["pathway"]]
+        if job["force"]:
+            command.append("--force")
+        return command
+
+    def _start(self, job):
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(self.log_path(job["id"]), "ab") as log:
+            process = subprocess.Popen(
+                self._command(job), cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL, env=dict(os.environ, PYTHONUNBUFFERED="1"),
+                start_new_session=True)
+        self._children[job["id"]] = (process, time.monotonic(), job)
+        with db.connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET pid = ?, pid_identity = ? WHERE id = ?",
+                         (process.pid, _identity(process.pid), job["id"]))
+        print(f"Job {job['id']}: {job['kind']} {job['pathway']} started (pid {process.pid})")
+
+    def _reap(self):
+        """Record the jobs of this process that have ended; returns them"""
+        finished = []
+        for job_id, (process, started, job) in list(self._children.items()):
+            code = process.poll()
+            if code is None and time.monotonic() - started > self.timeout:
+                _kill_group(process.pid, signal.SIGKILL)
+                code = process.wait()
+                finished.append(self._finish(job, FAILED, code, f"timed out after {self.timeout}s"))
+            elif code is not None:
+                finished.append(self._finish(job, SUCCEEDED if code == 0 else FAILED, code,
+                                             None if code == 0 else f"exited with code {code}"))
+            else:
+                continue
+            del self._children[job_id]
+        return finished
+
+    def _finish(self, job, status, exit_code, error):
+        with db.connect(self.db_path) as conn:
+            conn.execute(FINISH_SQL, (status, exit_code, error, job["id"]))
+        print(f"Job {job['id']}: {job['kind']} {job['pathway']} {status}" + (f" ({error})" if error else ""))
+        return dict(job, status=status)
+
+    def _notify(self, job):
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                print(f"Job runner: on_finish failed for job {job['id']}: {e}")
+
+    def _recover(self):
+        """Fail jobs left 'running' by a process that no longer exists"""
+        conn = db.connect(self.db_path)
+        rows = conn.execute("SELECT id, runner_pid, runner_identity, pid, pid_identity FROM jobs "
+                            "WHERE status = 'running'").fetchall()
+        stale = [(job_id, pid, pid_identity) for job_id, runner_pid, runner_identity, pid, pid_identity in rows
+                 if runner_pid is None or not _is_process(runner_pid, runner_identity)]
+        for job_id, pid, pid_identity in stale:
+            # the training processes can outlive the worker that started them; their group is only
+            # signalled while its leader is still the job's own process
+            if pid is not None and pid_identity is not None and _identity(pid) == pid_identity:
+                _kill_group(pid, signal.SIGKILL)
+        if stale:
+            with conn:
+                conn.executemany(FINISH_SQL, [(FAILED, None, "interrupted: the process running it exited", job_id)
+                                              for job_id, pid, pid_identity in stale])
+
+    def close(self):
+        """Stop this process's running jobs (they are marked failed)"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._stop_children()
+
+    def _stop_children(self):
+        for job_id, (process, started, job) in list(self._children.items()):
+            _kill_group(process.pid, signal.SIGTERM)
+            _wait_unreaped(process.pid, 10)
+            # pool workers that outlived their parent (or a parent ignoring SIGTERM); the parent
+            # isn't reaped yet, so its pid, and with it the group id, can't have been reused
+            _kill_group(process.pid, signal.SIGKILL)
+            code = process.wait()
+            self._finish(job, FAILED, code, "interrupted: the server shut down")
+            del self._children[job_id]
+
+def _wait_unreaped(pid, timeout):
+    """Wait up to timeout seconds for a child to exit, leaving it unreaped (it keeps its pid)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+                return
+        except ChildProcessError:
+            return
+        time.sleep(0.05)
+
+def _boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _identity(pid):
+    """'<boot id>:<start time>' of a running process, None if it doesn't exist (or there is no /proc)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # field 22 is the start time in clock ticks since boot; the command name (field 2, in
+    # parentheses) may contain spaces, so count from the last ')'
+    return f"{_boot_id()}:{stat.rsplit(')', 1)[1].split()[19]}"
+
+def _is_process(pid, identity):
+    """Whether pid is still the process recorded as identity (just alive, if none was recorded)"""
+    if identity is None:
+        return _alive(pid)
+    return _identity(pid) == identity
+
+def _kill_group(pid, sig):
+    """Send sig to the process group led by pid (a job started with start_new_session)"""
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,86 @@
+"""
+Keyword scoring for recommendation boosting.
+
+A KeywordScorer compiles one category's keyword tiers into an Aho-Corasick automaton once, so
+scoring a title is a single pass over its characters no matter how many keywords there are.
+Scores are the same as checking `keyword in title` for every keyword: each keyword that occurs
+in the title counts once, overlapping keywords all count ('bs' and 'bsit' both match "bsit"),
+and a keyword listed in two tiers earns the points of both.
+
+Titles come from the models' fixed label sets, so scores are also memoized per title.
+"""
+
+from collections import deque
+
+class KeywordScorer:
+    MAX_CACHED_TITLES = 4096
+
+    def __init__(self, keywords_dict, points):
+        """
+        keywords_dict: {tier: [keyword, ...]}, e.g. {'primary': [...], 'secondary': [...]}
+        points: {tier: points awarded per keyword of that tier found in a title}
+        """
+        weights = {}
+        for tier, keywords in keywords_dict.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                weights[keyword] = weights.get(keyword, 0) + points.get(tier, 0)
+        self.keywords = list(weights)
+        self.weights = [weights[kw] for kw in self.keywords]
+        self._build(self.keywords)
+        self._scores = {}
+
+    def _build(self, keywords):
+        # trie
+        goto = [{}]
+        output = [set()]
+        for idx, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(set())
+                state = nxt
+            output[state].add(idx)
+
+        # failure links, breadth first; then fold them into the transitions so scanning is
+        # one dict lookup per character (characters that start no keyword go back to the root)
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            delta[state] = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                delta[state][ch] = nxt
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._output = [frozenset(out) for out in output]
+
+    def matches(self, title):
+        """Indices (into self.keywords) of the keywords that occur in title"""
+        delta = self._delta
+        output = self._output
+        found = set()
+        state = 0
+        for ch in title.lower():
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def score(self, title):
+        """Sum of the points of every distinct keyword found in title"""
+        score = self._scores.get(title)
+        if score is None:
+            weights = self.weights
+            score = sum(weights[idx] for idx in self.matches(title))
+            if len(self._scores) < self.MAX_CACHED_TITLES:
+                self._scores[title] = score
+        return score
@@ -0,0 +1,54 @@
+"""
+Thread-safe, log-bucketed latency histogram (fixed memory, cheap to record into).
+"""
+
+import bisect
+import threading
+
+class LatencyHistogram:
+    # bucket upper bounds in milliseconds, roughly log-spaced
+    BOUNDS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)  # last bucket: slower than every bound
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        bucket = bisect.bisect_left(self.BOUNDS_MS, elapsed_ns / 1e6)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total_ns += elapsed_ns
+            self.max_ns = max(self.max_ns, elapsed_ns)
+
+    def _quantile(self, counts, count, max_ns, q):
+        # upper bound of the bucket holding the q-th sample (never above the slowest sample)
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.BOUNDS_MS, counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, round(max_ns / 1e6, 4))
+        return round(max_ns / 1e6, 4)
+
+    def stats(self):
+        with self._lock:
+            counts, count, total_ns, max_ns = list(self.counts), self.count, self.total_ns, self.max_ns
+        if not count:
+            return {"count": 0}
+        return {
+            "count": count,
+            "mean_ms": round(total_ns / count / 1e6, 4),
+            "max_ms": round(max_ns / 1e6, 4),
+            "p50_ms": self._quantile(counts, count, max_ns, 0.50),
+            "p95_ms": self._quantile(counts, count, max_ns, 0.95),
+            "p99_ms": self._quantile(counts, count, max_ns, 0.99),
+            "buckets_ms": {label: n for label, n in zip(self._labels(), counts) if n},
+        }
+
+    @classmethod
+    def _labels(cls):
+        return [f"<={bound}" for bound in cls.BOUNDS_MS] + [f">{cls.BOUNDS_MS[-1]}"]
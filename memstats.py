@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Per-process memory usage read from /proc (Linux only).
+
+RSS counts every resident page, including pages shared with other processes; USS counts only
+the pages private to the process, i.e. what it would free on exit. With preload_app + gc.freeze
+the forked gunicorn workers should show a USS well below their RSS, the difference being the
+model data they share copy-on-write with the master.
+
+Usage: python memstats.py <gunicorn master pid>
+"""
+
+import os
+import sys
+
+def process_memory(pid):
+    """{"pid", "rss_kb", "pss_kb", "uss_kb", "shared_kb"} for one process, or None if unavailable"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    fields = {}
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(":"):
+            fields[parts[0][:-1]] = int(parts[1])
+
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "pid": pid,
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": uss,
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def worker_memory(master_pid=None):
+    """
+    Memory of a gunicorn master and all of its workers.
+    master_pid defaults to this process's parent, which is the master when called from a worker.
+    """
+    master_pid = master_pid or os.getppid()
+    workers = [m for m in (process_memory(pid) for pid in child_pids(master_pid)) if m]
+    return {"master": process_memory(master_pid), "workers": workers}
+
+def format_report(report):
+    rows = [("master", report["master"])] + [("worker", m) for m in report["workers"]]
+    lines = [f"{'role':<8} {'pid':>7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}"]
+    for role, m in rows:
+        if m:
+            lines.append(f"{role:<8} {m['pid']:>7} {m['rss_kb'] / 1024:>8.1f} {m['pss_kb'] / 1024:>8.1f} {m['uss_kb'] / 1024:>8.1f}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    print(format_report(worker_memory(int(sys.argv[1]))))
@@ -1,68 +1,422 @@
+import os
 import joblib
 import numpy as np
 import pandas as pd
+from compiled_forest import CompiledForest
+from artifacts import ARTIFACT_ROOT, current_version, load_artifacts
+from recommendation_rules import BOOST_PARAMS, PATHWAY_SCORERS, PROGRAM_TYPES, matches_program_type
+
+def lookup_table_path(model_path):
+    """Where train_model.py --precompute stores the exhaustive prediction table for a model pack"""
+    return os.path.splitext(model_path)[0] + "_table.npz"
+
+ENGINES = ("sklearn", "compiled")
+PATHWAYS = ("career", "education", "tesda")
+
+def published_version(pathway, artifact_root=ARTIFACT_ROOT):
+    """
+    Version load_all would pick up for a pathway right now: the CURRENT artifact version,
+    else an mtime stamp of the legacy pickle, else None.
+    """
+    version = current_version(pathway, artifact_root) if artifact_root else None
+    if version:
+        return version
+    path = f"model_{pathway}.pkl"
+    return f"pkl-{os.path.getmtime(path):.0f}" if os.path.exists(path) else None
 
 class MLModel:
-    def __init__(self):
+    def __init__(self, engine="sklearn"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine: {engine}")
+        self.engine = engine  # default engine for every pathway loaded by load_all
         self.models = {}  # pathway -> pack dict
 
-    def load_all(self):
-        for key in ["career","education","tesda"]:
+    def load_all(self, artifact_root=ARTIFACT_ROOT):
+        """
+        Load every pathway, preferring the versioned artifacts under artifact_root
+        (memory-mapped, compiled engine only) and falling back to the legacy model_<pathway>.pkl.
+        Pass artifact_root=None to load the pickles (and their sklearn estimators) only.
+        """
+        for key in PATHWAYS:
+            if artifact_root and current_version(key, artifact_root):
+                path = f"{artifact_root}/{key}"
+                try:
+                    self.models[key] = load_artifacts(key, root=artifact_root)
+                    self._build_class_masks(key, self.models[key])
+                    self._build_keyword_scores(key, self.models[key])
+                    self.set_engine(key, "compiled")
+                    print("Loaded", path, self.models[key]["version"])
+                    if self.engine != "compiled":
+                        print(f"Warning: {key} artifacts have no sklearn estimator; "
+                              f"using the compiled engine instead of {self.engine}")
+                    continue
+                except Exception as e:
+                    print("Could not load", path, e)
+
             path = f"model_{key}.pkl"
             try:
                 pack = joblib.load(path)
+                pack["version"] = published_version(key, artifact_root=None)
+                self.prepare_pack(pack)
+                self._load_table(pack, lookup_table_path(path))
+                self._build_class_masks(key, pack)
+                self._build_keyword_scores(key, pack)
                 self.models[key] = pack
+                self.set_engine(key, self.engine)
                 print("Loaded", path)
             except Exception as e:
                 print("Could not load", path, e)
 
-    def predict_top_k(self, pathway, input_dict, k=10):
+    @staticmethod
+    def _build_class_masks(pathway, pack):
         """
-        input_dict: raw fields matching feature_cols stored in pack
-        returns: list of dicts: {title, match, metadata_row}
+        Per-class boolean masks for filtering recommendations, built once from the class labels
+        and metadata: class_masks[criterion][value] is True for the classes that qualify.
         """
-        if pathway not in self.models:
-            return []
+        labels = pack["labels"]
+        masks = {}
+        if pathway == "education":
+            masks["program_type"] = {
+                program_type: np.array([matches_program_type(program_type, str(label)) for label in labels], dtype=bool)
+                for program_type in PROGRAM_TYPES
+            }
+        fields = np.array([str(meta.get("field", "")).lower() for meta in pack["metadata"]])
+        if any(fields):
+            masks["field"] = {field: fields == field for field in set(fields) if field}
+        pack["class_masks"] = masks
 
+    @staticmethod
+    def _build_keyword_scores(pathway, pack):
+        """
+        Keyword boost score of every class title for every keyword category of the pathway,
+        as an (n_classes x n_categories) matrix, so boosting is a lookup instead of string matching.
+        """
+        scorers = PATHWAY_SCORERS.get(pathway, {})
+        titles = [str(label) for label in pack["labels"]]
+        matrix = np.zeros((len(titles), len(scorers)), dtype=np.int32)
+        for col, scorer in enumerate(scorers.values()):
+            matrix[:, col] = [scorer.score(title) for title in titles]
+        pack["keyword_scores"] = {
+            "categories": {category: col for col, category in enumerate(scorers)},
+            "matrix": matrix,
+        }
+
+    def keyword_scores(self, pathway, category):
+        """Per-class keyword score for one category (e.g. the selected industry), or None if unknown"""
+        pack = self.models.get(pathway)
+        if pack is None:
+            return None
+        col = pack["keyword_scores"]["categories"].get(category)
+        return None if col is None else pack["keyword_scores"]["matrix"][:, col]
+
+    def class_mask(self, pathway, **criteria):
+        """
+        AND of the precomputed masks for the given criteria, e.g.
+        class_mask("education", program_type="college", field="technology").
+        A value no class has (or a pathway that isn't loaded) gives an all-False mask.
+        """
+        pack = self.models.get(pathway)
+        if pack is None:
+            return np.zeros(0, dtype=bool)
+        mask = np.ones(len(pack["labels"]), dtype=bool)
+        for criterion, value in criteria.items():
+            value_mask = pack["class_masks"].get(criterion, {}).get(str(value).lower())
+            if value_mask is None:
+                return np.zeros_like(mask)
+            mask &= value_mask
+        return mask
+
+    def version(self, pathway):
+        """Version of the loaded pack for a pathway (None if the pathway is not loaded)"""
+        pack = self.models.get(pathway)
+        return pack.get("version") if pack else None
+
+    def set_engine(self, pathway, engine):
+        """
+        Choose how the forest is evaluated for one pathway:
+        "sklearn" calls model.predict_proba, "compiled" walks flattened node arrays with NumPy
+        (same probabilities, far less fixed overhead per call).
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine: {engine}")
         pack = self.models[pathway]
-        model = pack["model"]
+        if engine == "sklearn" and "model" not in pack:
+            raise ValueError(f"{pathway} was loaded from artifacts and has no sklearn estimator")
+        if engine == "compiled" and "compiled_forest" not in pack:
+            pack["compiled_forest"] = CompiledForest.from_sklearn(pack["model"])
+        pack["engine"] = engine
+
+    def _load_table(self, pack, path):
+        """Attach a precomputed lookup table if one exists and matches the loaded pack"""
+        if not os.path.exists(path):
+            return
+        with np.load(path) as data:
+            table = {name: data[name] for name in ("dims", "probs", "top_idx")}
+        dims = [len(pack["vocab"][col]) for col in pack["feature_cols"]]
+        if list(table["dims"]) != dims or table["probs"].shape != (int(np.prod(dims)), len(pack["labels"])):
+            print("Ignoring stale lookup table", path)
+            return
+        pack["table"] = table
+        print("Loaded", path)
+
+    @staticmethod
+    def prepare_pack(pack):
+        """
+        Precompile per-feature lookup tables so requests never touch sklearn encoders.
+        vocab: {col: {value: code}} built from each LabelEncoder's classes_
+        fallback_codes: code used for unseen values (most frequent training value per column)
+        """
         encoders = pack["encoders"]
-        target_enc = pack["target_encoder"]
         feature_cols = pack["feature_cols"]
         raw_df = pack["raw_df"]
 
-        # build X row in correct order
-        row = []
-        for col in feature_cols:
+        vocab = {}
+        fallback_codes = np.zeros(len(feature_cols), dtype=np.int64)
+        for i, col in enumerate(feature_cols):
+            col_vocab = {str(v): code for code, v in enumerate(encoders[col].classes_)}
+            vocab[col] = col_vocab
+            if col in raw_df.columns:
+                codes = raw_df[col].fillna("NA").astype(str).map(col_vocab).dropna()
+                if not codes.empty:
+                    fallback_codes[i] = int(codes.value_counts().idxmax())
+
+        pack["vocab"] = vocab
+        pack["fallback_codes"] = fallback_codes
+
+        # class index -> label / first dataset row for that label, so results are plain array lookups
+        labels = np.asarray(pack["target_encoder"].classes_).astype(str)
+        target_col = pack.get("target_col") or MLModel._infer_target_col(raw_df, feature_cols, labels)
+        first_rows = {}
+        if target_col is not None:
+            deduped = raw_df.drop_duplicates(subset=[target_col])
+            for key, rec in zip(deduped[target_col].astype(str), deduped.to_dict(orient="records")):
+                first_rows[key] = rec
+        pack["target_col"] = target_col
+        pack["labels"] = labels
+        pack["metadata"] = [first_rows.get(label, {}) for label in labels]
+
+    @staticmethod
+    def _infer_target_col(raw_df, feature_cols, labels):
+        """Packs saved before target_col was stored: pick the column whose values are the target classes"""
+        label_set = set(labels)
+        for col in raw_df.columns:
+            if col not in feature_cols and set(raw_df[col].fillna("NA").astype(str)) == label_set:
+                return col
+        return None
+
+    def encode_input(self, pathway, input_dict):
+        """
+        Encode a raw input dict into the model's integer feature row.
+        returns: (codes, unseen) where codes is an int array ordered like feature_cols
+                 and unseen lists the columns whose value was not in the training vocabulary
+                 (those columns are encoded with the column's most frequent training value)
+        """
+        pack = self.models[pathway]
+        feature_cols = pack["feature_cols"]
+        vocab = pack["vocab"]
+
+        codes = np.empty(len(feature_cols), dtype=np.int64)
+        for i, col in enumerate(feature_cols):
             val = input_dict.get(col, "")
             # ensure consistent string type as used in training
             val = str(val if val is not None else "")
-            le = encoders[col]
-            # if unseen value, attempt to handle: add as new label by mapping to -1 (we'll map to most common)
-            if val in le.classes_:
-                encoded = int(le.transform([val])[0])
+            codes[i] = vocab[col].get(val, -1)
+        missing = codes < 0
+        unseen = [col for col, m in zip(feature_cols, missing) if m]
+        if unseen:
+            codes[missing] = pack["fallback_codes"][missing]
+        return codes, unseen
+
+    def encode_frame(self, pathway, inputs):
+        """
+        Vectorized encode_input for many rows.
+        inputs: list of input dicts or a DataFrame with (a subset of) the feature_cols
+        returns: (codes, unseen) int array of shape (n_rows, n_features) and a same-shaped bool mask
+        """
+        pack = self.models[pathway]
+        feature_cols = pack["feature_cols"]
+        vocab = pack["vocab"]
+        frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame.from_records(list(inputs))
+
+        codes = np.empty((len(frame), len(feature_cols)), dtype=np.int64)
+        for i, col in enumerate(feature_cols):
+            if col in frame.columns:
+                values = frame[col].where(frame[col].notna(), "").astype(str)
+                codes[:, i] = values.map(vocab[col]).fillna(-1).to_numpy(dtype=np.int64)
             else:
-                # fallback: encode as most frequent class (index 0)
-                encoded = 0
-            row.append(encoded)
+                codes[:, i] = vocab[col].get("", -1)
+        unseen = codes < 0
+        if unseen.any():
+            codes = np.where(unseen, pack["fallback_codes"][None, :], codes)
+        return codes, unseen
 
-        # Create DataFrame with feature names to avoid sklearn warning
-        X = pd.DataFrame([row], columns=feature_cols)
-        probs = model.predict_proba(X)[0]  # probabilities for each target class
-        top_idx = np.argsort(probs)[::-1][:k]
+    @staticmethod
+    def _top_k_indices(probs, k):
+        """
+        Row-wise top-k class indices of a (n_rows, n_classes) probability matrix, best first.
+        Ranked exactly like np.argsort(probs)[::-1], the order predict_top_k has always served
+        (tied classes, e.g. the zero-probability ones padding a candidate pool, mostly go to the
+        higher class index), so single-row, batch and lookup-table results agree with it.
+        """
+        n_rows, n_classes = probs.shape
+        k = max(0, min(k, n_classes))
+        return np.argsort(probs, axis=1)[:, ::-1][:, :k]
 
+    @staticmethod
+    def _build_results(pack, probs, top_idx, match=None):
+        # match: match percentages to report (one per entry of top_idx) instead of the probabilities
+        labels = pack["labels"]
+        metadata = pack["metadata"]
         results = []
-        for idx in top_idx:
-            label = target_enc.inverse_transform([idx])[0]
-            match_score = round(float(probs[idx]) * 100, 1)  # e.g., 92.4
-            # get first matching row metadata by label (search last column which is the target)
-            target_col = raw_df.columns[-1]
-            meta_row = raw_df[raw_df[target_col].astype(str) == str(label)].head(1)
-            meta = meta_row.to_dict(orient="records")[0] if not meta_row.empty else {}
+        for pos, idx in enumerate(top_idx):
+            if match is None:
+                match_score = round(float(probs[idx]) * 100, 1)  # e.g., 92.4
+            else:
+                match_score = float(match[pos])
             results.append({
-                "title": str(label),
+                "title": str(labels[idx]),
                 "match": match_score,
-                "metadata": meta
+                # copy so callers can't mutate the shared index
+                "metadata": dict(metadata[idx])
             })
-
         return results
+
+    @staticmethod
+    def _model_proba(pack, codes):
+        if pack.get("engine") == "compiled":
+            return pack["compiled_forest"].predict_proba(codes)
+        # Create DataFrame with feature names to avoid sklearn warning
+        X = pd.DataFrame(codes, columns=pack["feature_cols"])
+        return pack["model"].predict_proba(X)
+
+    def _predict_proba(self, pack, codes, unseen):
+        """
+        Class probabilities for encoded rows. Rows whose values were all seen in training are
+        read from the lookup table when the pack has one; the rest go through the forest.
+        """
+        table = pack.get("table")
+        if table is None:
+            return self._model_proba(pack, codes)
+
+        live = unseen.any(axis=1)
+        probs = np.empty((len(codes), table["probs"].shape[1]))
+        if not live.all():
+            probs[~live] = table["probs"][np.ravel_multi_index(codes[~live].T, table["dims"])]
+        if live.any():
+            probs[live] = self._model_proba(pack, codes[live])
+        return probs
+
+    @staticmethod
+    def _mask_probs(probs, class_mask):
+        # ineligible classes sort below every eligible one (probabilities are >= 0)
+        return np.where(class_mask, probs, -1.0)
+
+    def candidates(self, pathway, input_dict, k, class_mask=None):
+        """
+        (probs, top_idx) for one profile: the probability of every class and the k most probable
+        classes (among class_mask, if given), best first
+        """
+        pack = self.models[pathway]
+
+        # build X row in correct order; unseen values fall back to the most frequent training value
+        row, unseen = self.encode_input(pathway, input_dict)
+
+        if class_mask is not None:
+            k = min(k, int(class_mask.sum()))
+
+        table = pack.get("table")
+        if table is not None and not unseen:
+            # direct lookup: the whole input space was scored at training time
+            flat = np.ravel_multi_index(tuple(row), table["dims"])
+            probs = table["probs"][flat]
+            if class_mask is None and k <= table["top_idx"].shape[1]:
+                return probs, table["top_idx"][flat, :k]
+        else:
+            probs = self._model_proba(pack, row[None, :])[0]  # probabilities for each target class
+
+        ranked = probs if class_mask is None else self._mask_probs(probs, class_mask)
+        return probs, self._top_k_indices(ranked[None, :], k)[0]
+
+    def predict_top_k(self, pathway, input_dict, k=10, class_mask=None):
+        """
+        input_dict: raw fields matching feature_cols stored in pack
+        class_mask: optional bool array over classes (see class_mask()); only those classes are ranked
+        returns: list of dicts: {title, match, metadata_row}
+        """
+        if pathway not in self.models:
+            return []
+
+        probs, top_idx = self.candidates(pathway, input_dict, k, class_mask)
+        return self._build_results(self.models[pathway], probs, top_idx)
+
+    def boost(self, pathway, probs, top_idx, category, bonus=0.0):
+        """
+        Keyword boosting of the candidates top_idx for category (an industry, course interest or
+        program type), per BOOST_PARAMS[pathway].
+        bonus: extra match points for every keyword hit (e.g. the education field-of-interest bonus)
+        returns: (match, score) per candidate: match percentage (boosted for keyword hits) and keyword score
+        """
+        match = np.array([round(float(probs[idx]) * 100, 1) for idx in top_idx])
+        scores = self.keyword_scores(pathway, category)
+        if scores is None:
+            return match, np.zeros(len(top_idx), dtype=np.int32)
+
+        params = BOOST_PARAMS[pathway]
+        score = scores[top_idx]
+        hit = score > 0
+        # Start with original match or minimum base score (whichever is higher), add the keyword bonus
+        keyword_bonus = np.minimum(score[hit] / params["score_divisor"] * params["bonus_multiplier"], params["max_bonus"])
+        boosted = np.minimum(np.maximum(match[hit], params["min_base_score"]) + keyword_bonus, params["max_match_score"])
+        if bonus:
+            boosted = np.minimum(boosted + bonus, params["max_match_score"])
+        match[hit] = boosted
+        return match, score
+
+    def rank(self, pathway, top_idx, match, score, n=5):
+        """
+        The best n candidates: keyword hits by score, then boosted match (ties keep the model's
+        order), or the n most probable candidates if none hit.
+        returns: predict_top_k-style result list
+        """
+        hit = np.flatnonzero(score > 0)
+        if len(hit):
+            order = hit[np.lexsort((-match[hit], -score[hit]))[:n]]
+        else:
+            order = np.arange(min(n, len(top_idx)))
+        return self._build_results(self.models[pathway], None, top_idx[order], match=match[order])
+
+    def predict_boosted(self, pathway, input_dict, category, k=10, n=5, class_mask=None, bonus=0.0):
+        """
+        Top-k candidates re-ranked by keyword relevance to category, see boost() and rank().
+        returns: the best n keyword hits, or the n most probable candidates if none hit
+        """
+        if pathway not in self.models:
+            return []
+
+        probs, top_idx = self.candidates(pathway, input_dict, k, class_mask)
+        match, score = self.boost(pathway, probs, top_idx, category, bonus)
+        return self.rank(pathway, top_idx, match, score, n)
+
+    def predict_top_k_batch(self, pathway, inputs, k=10, class_mask=None):
+        """
+        Score many profiles with one predict_proba call.
+        inputs: list of input dicts or a DataFrame with the feature_cols
+        class_mask: optional bool array over classes, applied to every row
+        returns: one predict_top_k-style result list per input row
+        """
+        if pathway not in self.models:
+            return []
+
+        pack = self.models[pathway]
+
+        codes, unseen = self.encode_frame(pathway, inputs)
+        if len(codes) == 0:
+            return []
+
+        probs = self._predict_proba(pack, codes, unseen)
+        if class_mask is None:
+            top_idx = self._top_k_indices(probs, k)
+        else:
+            top_idx = self._top_k_indices(self._mask_probs(probs, class_mask), min(k, int(class_mask.sum())))
+
+        return [self._build_results(pack, row_probs, row_idx) for row_probs, row_idx in zip(probs, top_idx)]
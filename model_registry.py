@@ -0,0 +1,79 @@
+"""
+Serving-side registry for the ML models.
+
+Requests grab one immutable MLModel snapshot with registry.current() and use it for the whole
+request. A reload builds a complete new MLModel off to the side and then replaces the reference
+in a single assignment, so no request ever sees a half-loaded model and nobody waits for a load.
+
+Every worker process has its own registry. They stay in sync by watching what is published on
+disk: train_model.py moves models/<pathway>/CURRENT to the new version, and each worker notices
+the change on its next check (at most every check_interval seconds, a few small file reads) and
+reloads in a background thread.
+"""
+
+import threading
+import time
+from artifacts import ARTIFACT_ROOT
+from ml_model import MLModel, PATHWAYS, published_version
+
+class ModelRegistry:
+    def __init__(self, engine="sklearn", artifact_root=ARTIFACT_ROOT, check_interval=5.0):
+        self.engine = engine
+        self.artifact_root = artifact_root
+        self.check_interval = check_interval
+        self._model = None         # MLModel being served; replaced whole, never mutated
+        self._generation = None    # published versions the current snapshot was loaded for
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self._listeners = []
+        self.reloads = 0
+
+    def current(self):
+        """The MLModel to use for this request (None until the first successful load)"""
+        if time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            if self._published_generation() != self._generation:
+                threading.Thread(target=self.reload, name="model-reload", daemon=True).start()
+        return self._model
+
+    @property
+    def generation(self):
+        """{pathway: version} of the snapshot currently served"""
+        return dict(zip(PATHWAYS, self._generation)) if self._generation else {}
+
+    def on_swap(self, callback):
+        """Register callback(old_model, new_model), called right after a new snapshot goes live"""
+        self._listeners.append(callback)
+
+    def _published_generation(self):
+        return tuple(published_version(p, self.artifact_root) for p in PATHWAYS)
+
+    def reload(self, force=False):
+        """
+        Load the published models into a fresh MLModel and swap it in.
+        Returns False without doing anything if another reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            generation = self._published_generation()
+            if generation == self._generation and not force:
+                return True
+            model = MLModel(engine=self.engine)
+            model.load_all(artifact_root=self.artifact_root)
+            old = self._model
+            # single reference assignment: requests see either the old or the new snapshot
+            self._model = model
+            # remembered even if some pathway failed to load, so a broken version isn't retried in a loop
+            self._generation = generation
+            self.reloads += 1
+            for callback in self._listeners:
+                callback(old, model)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def wait_for_reload(self, timeout=None):
+        """Block until a reload running in the background (if any) has finished"""
+        if self._reload_lock.acquire(timeout=-1 if timeout is None else timeout):
+            self._reload_lock.release()
@@ -0,0 +1,78 @@
+"""
+Keyset pagination for the admin list endpoints.
+
+Lists are ordered newest first by (created_at, id). Instead of an OFFSET, which makes SQLite step
+over every skipped row, a page asks for the rows after the last one of the previous page:
+
+    WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?
+
+which is a range seek on the (..., created_at) indexes (they end in the rowid), so every page
+costs the same however deep it is and however large the table gets. The position is handed to
+the client as an opaque cursor.
+"""
+
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(*key):
+    """Opaque cursor for the sort key of the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, length=2):
+    """The sort key (a tuple of length values) of the last row already seen, or None for the first page"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if (not isinstance(key, list) or len(key) != length
+            or not all(isinstance(value, (str, int)) and not isinstance(value, bool) for value in key)):
+        raise InvalidCursor(cursor)
+    return tuple(key)
+
+def page_size(value):
+    """The requested page size, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def page_query(select, where, params, limit, after=None, prefix=""):
+    """
+    (sql, params) fetch_page runs for one page: `select` (a query without WHERE/ORDER BY) filtered
+    by the where conditions, after the row with key `after` (None for the first page), newest first.
+    One row more than limit is asked for, to tell whether there is a next page.
+    """
+    where = list(where)
+    params = list(params)
+    if after is not None:
+        where.append(f"({prefix}created_at, {prefix}id) < (?, ?)")
+        params.extend(after)
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {prefix}created_at DESC, {prefix}id DESC LIMIT ?"
+    return sql, params + [limit + 1]
+
+def fetch_page(conn, select, where, params, limit, cursor, columns, prefix=""):
+    """
+    One page of `select` (a query without WHERE/ORDER BY) as a list of dicts keyed by columns,
+    and the cursor of the next page (None on the last page).
+    where: list of conditions; prefix: table alias of created_at and id (e.g. "r.")
+    """
+    sql, params = page_query(select, where, params, limit, decode_cursor(cursor), prefix)
+    rows = conn.execute(sql, params).fetchall()
+    items = [dict(zip(columns, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
@@ -0,0 +1,39 @@
+"""
+SQL run by the routes in app.py.
+
+Kept in one place so check_query_plans.py can EXPLAIN the statements the routes actually run
+instead of copies of them. The admin list SELECTs are completed (filters, keyset condition,
+ORDER BY, LIMIT) by pagination.fetch_page.
+"""
+
+REGISTER_SQL = 'INSERT INTO users (username, password) VALUES (?, ?)'
+
+LOGIN_SQL = 'SELECT id, password FROM users WHERE username = ?'
+
+SAVE_RECOMMENDATION_SQL = '''INSERT INTO recommendations (user_id, pathway, recommendation_data, title, match_score, saved)
+    VALUES (?, ?, ?, ?, ?, 1)'''
+
+MY_RECOMMENDATIONS_SQL = 'SELECT * FROM recommendations WHERE user_id = ? AND saved = 1'
+
+REMOVE_RECOMMENDATION_SQL = 'DELETE FROM recommendations WHERE id = ? AND user_id = ?'
+
+# admin panel
+USER_ID_SQL = 'SELECT id FROM users WHERE username = ?'
+
+DELETE_USER_SQL = 'DELETE FROM users WHERE id = ?'
+
+DELETE_RECOMMENDATION_SQL = 'DELETE FROM recommendations WHERE id = ?'
+
+ADMIN_USERS_SELECT = 'SELECT id, username as email, NULL as name, created_at, NULL as last_login FROM users'
+
+# title and match_score are extracted when a recommendation is saved (see recommendation_codec)
+ADMIN_RECOMMENDATIONS_SELECT = '''SELECT r.id, u.username as user_email, r.pathway as pathway_type,
+        COALESCE(r.title, 'Unknown'), COALESCE(r.match_score, 0.75), r.created_at
+    FROM recommendations r
+    JOIN users u ON r.user_id = u.id'''
+ADMIN_RECOMMENDATIONS_COLUMNS = ('id', 'user_email', 'pathway_type', 'title', 'match_score', 'created_at')
+
+SAVED_FILTER = 'r.saved = 1'
+PATHWAY_FILTER = 'r.pathway = ?'
+# checked on the rows of the same newest-first index walk, so the keyset cursor still applies
+TITLE_FILTER = "instr(lower(COALESCE(r.title, 'Unknown')), lower(?)) > 0"
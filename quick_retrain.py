@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 """
 Simple script to retrain just the education model.
-Uses only standard libraries and sklearn (already in your requirements).
+Uses the same training code as train_model.py.
 """
 
 import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
+from train_model import train_all_models
 
 print("=" * 60)
 print("RETRAINING EDUCATION MODEL WITH FIELD SUPPORT")
@@ -28,45 +26,11 @@ if 'field' not in df.columns:
 print(f"   ✓ Field column found with {df['field'].nunique()} unique fields")
 
 # Train the model
-print("\n2. Training Random Forest model...")
-# IMPORTANT: Include 'field' as a feature so the model uses it for predictions!
-feature_cols = ["modality", "budget", "learning_style", "motivation", "field"]
-target_col = "program_name"
-
-X = df[feature_cols].copy()
-y = df[target_col].copy()
-
-# Encode features
-encoders = {}
-for col in X.columns:
-    le = LabelEncoder()
-    X[col] = X[col].fillna("").astype(str)
-    X[col] = le.fit_transform(X[col])
-    encoders[col] = le
-    print(f"   ✓ Encoded '{col}': {len(le.classes_)} unique values")
-
-# Encode target
-y_le = LabelEncoder()
-y = y.fillna("NA").astype(str)
-y_enc = y_le.fit_transform(y)
-print(f"   ✓ Encoded target: {len(y_le.classes_)} unique programs")
-
-# Train model
-print("\n3. Training with 400 trees...")
-model = RandomForestClassifier(n_estimators=400, n_jobs=-1, random_state=42)
-model.fit(X, y_enc)
-print("   ✓ Model trained successfully")
-
-# Save model
-print("\n4. Saving model...")
-joblib.dump({
-    "model": model,
-    "encoders": encoders,
-    "target_encoder": y_le,
-    "feature_cols": feature_cols,
-    "raw_df": df  # This includes the 'field' column!
-}, "model_education.pkl")
-print("   ✓ Saved to model_education.pkl")
+print("\n2. Training Random Forest model with 400 trees...")
+# IMPORTANT: 'field' is a feature of the education model (see TRAINING_SPECS in train_model.py)
+# Same training path as train_model.py, so the pickle and the served artifacts are updated together
+train_all_models(pathways=["education"], force=True)  # retrain even if the inputs are unchanged
+print("   ✓ Model trained and saved")
 
 print("\n" + "=" * 60)
 print("✅ SUCCESS! Education model retrained with field support")
@@ -76,4 +40,4 @@ print("Recommendations will be filtered by:")
 print("  - Program Type (SHS, College, ALS, Graduate)")
 print("  - Education Level")
 print("  - Field of Interest (if selected)")
-print("\nRestart your Flask app to use the new model.")
+print("\nRunning app workers pick up the new model within a few seconds.")
@@ -0,0 +1,87 @@
+"""
+Bounded, thread-safe LRU + TTL cache for model predictions.
+
+map_inputs collapses free-form answers onto a small set of canonical feature values, so many
+users end up with the exact same feature tuple. Keys include the model version, so a retrained
+model never serves old entries; the registry also clears the cache on every swap.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class RecommendationCache:
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, results), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(pathway, model_version, features, k, variant=None):
+        """variant: anything else the results depend on (selected category, class mask, ...)"""
+        return (pathway, model_version, tuple(sorted(features.items())), k, variant)
+
+    @staticmethod
+    def _copy(results):
+        # callers adjust rec['match'] while boosting, so never hand out the cached dicts themselves
+        return [dict(rec) for rec in results]
+
+    def get(self, key):
+        """Cached results for key (a fresh copy), or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, results = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._copy(results)
+
+    def put(self, key, results):
+        results = self._copy(results)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        results = self.get(key)
+        if results is None:
+            results = compute()
+            self.put(key, results)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,56 @@
+"""
+Storage format of saved recommendations.
+
+A saved recommendation is stored as canonical JSON in recommendation_data, with its title and
+match score copied into their own columns when it is written, so listings read plain columns
+instead of parsing every row. match_score is a fraction (0.85); the pages send percentages (85).
+
+Rows written before that hold str(dict) (a Python literal); decode() still reads those, for the
+migration that converts them.
+"""
+
+import ast
+import json
+import re
+
+TITLE_PATTERN = re.compile(r"['\"]title['\"]:\s*['\"]([^'\"]+)['\"]")
+
+def match_fraction(match):
+    """A match percentage or fraction as a fraction (None if it isn't a number)"""
+    if isinstance(match, bool):
+        return None
+    try:
+        match = float(match)
+    except (TypeError, ValueError):
+        return None
+    return match / 100.0 if match > 1 else match
+
+def encode(recommendation):
+    """(recommendation_data, title, match_score) column values for one recommendation dict"""
+    title = recommendation.get('title')
+    return (json.dumps(recommendation, sort_keys=True, ensure_ascii=False),
+            str(title) if title is not None else None,
+            match_fraction(recommendation.get('match')))
+
+def decode(text):
+    """The recommendation dict stored in recommendation_data, JSON or legacy str(dict); None if unreadable"""
+    text = str(text or "").strip()
+    if not text:
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+    return value if isinstance(value, dict) else None
+
+def legacy_columns(text):
+    """encode() for a stored row; unreadable text is kept as it is, with whatever title can be found in it"""
+    recommendation = decode(text)
+    if recommendation is not None:
+        return encode(recommendation)
+    text = str(text or "")
+    found = TITLE_PATTERN.search(text)
+    return text, found.group(1) if found else (text[:50] or None), None
@@ -0,0 +1,164 @@
+"""
+The recommendation request path as explicit stages:
+
+    normalize -> filter -> infer -> boost -> rank -> persist
+
+normalize maps the questionnaire answers to feature values, filter works out which classes are
+eligible (education program type / field of interest) and the keyword category, infer gets the
+top candidates from the model, boost applies the keyword bonuses, rank picks the final list and
+persist stores the answers. Every stage is a plain method that takes and returns a
+RecommendationRequest, so each can be run on its own.
+
+Each stage is timed with perf_counter_ns into a per-process latency histogram (see stats()).
+Cached results skip infer, boost and rank, so those stages are only timed on cache misses.
+"""
+
+import time
+import input_normalizer
+from latency_histogram import LatencyHistogram
+from recommendation_cache import RecommendationCache
+from recommendation_rules import ALLOWED_PROGRAMS, FIELD_MATCH_BONUS
+
+STAGES = ("normalize", "filter", "infer", "boost", "rank", "persist")
+
+# Candidates scored and boosted per pathway, before the final top 5 is picked
+CANDIDATES = {'education': 50, 'tesda': 20, 'career': 5}
+RESULTS = 5
+
+class RecommendationError(Exception):
+    """The request can't be answered (e.g. no program of the selected type); message is for the user"""
+
+class RecommendationRequest:
+    """State passed from stage to stage"""
+    def __init__(self, ml_model, pathway, responses, user_id=None):
+        self.ml_model = ml_model
+        self.pathway = pathway
+        self.responses = responses
+        self.user_id = user_id
+        self.features = None
+        self.category = ""       # keyword category the candidates are boosted for
+        self.class_mask = None   # eligible classes (None: all)
+        self.mask_key = None     # what class_mask was built from, for the cache key
+        self.bonus = 0.0
+        self.cache_key = None
+        self.probs = None
+        self.top_idx = None
+        self.match = None
+        self.score = None
+        self.recommendations = None
+
+class RecommendationPipeline:
+    def __init__(self, cache=None, persist=None):
+        """
+        cache: RecommendationCache for the final recommendations (optional)
+        persist: persist(user_id, pathway, responses) callable storing the answers (optional)
+        """
+        self.cache = cache
+        self.persist_responses = persist
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES + ("total",)}
+
+    def _timed(self, stage, func, req):
+        start = time.perf_counter_ns()
+        try:
+            return func(req)
+        finally:
+            self.histograms[stage].record(time.perf_counter_ns() - start)
+
+    def run(self, ml_model, pathway, responses, user_id=None):
+        """Recommendations for one questionnaire; raises RecommendationError with a user-facing message"""
+        start = time.perf_counter_ns()
+        req = RecommendationRequest(ml_model, pathway, responses, user_id)
+        try:
+            req = self._timed("normalize", self.normalize, req)
+            req = self._timed("filter", self.filter, req)
+            if not self._from_cache(req):
+                req = self._timed("infer", self.infer, req)
+                req = self._timed("boost", self.boost, req)
+                req = self._timed("rank", self.rank, req)
+                if self.cache is not None and req.cache_key is not None:
+                    self.cache.put(req.cache_key, req.recommendations)
+            req = self._timed("persist", self.persist, req)
+            return req.recommendations
+        finally:
+            self.histograms["total"].record(time.perf_counter_ns() - start)
+
+    def _from_cache(self, req):
+        if self.cache is None or req.pathway not in req.ml_model.models:
+            return False
+        req.cache_key = RecommendationCache.make_key(
+            req.pathway, req.ml_model.version(req.pathway), req.features,
+            CANDIDATES.get(req.pathway, RESULTS), (req.category, req.mask_key, req.bonus))
+        req.recommendations = self.cache.get(req.cache_key)
+        return req.recommendations is not None
+
+    def normalize(self, req):
+        # Map frontend field names to model feature columns (must match feature_cols used in training)
+        req.features = input_normalizer.normalize(req.pathway, req.responses)
+        return req
+
+    def filter(self, req):
+        responses = req.responses
+        if req.pathway == 'career':
+            # Filter career recommendations by industry
+            req.category = responses.get('industry', '').lower()
+        elif req.pathway == 'tesda':
+            # Filter TESDA recommendations by course interest
+            req.category = responses.get('course_interest', '').lower()
+        elif req.pathway == 'education':
+            program_type = responses.get('program_type', '').lower()
+            education_level = responses.get('education_level', '').lower()
+            req.category = program_type
+
+            # Check if program type is allowed for education level
+            if education_level in ALLOWED_PROGRAMS and program_type not in ALLOWED_PROGRAMS[education_level]:
+                raise RecommendationError(
+                    f"For your education level, please select from: {', '.join(ALLOWED_PROGRAMS[education_level])}")
+
+            # Programs of the selected type, from the per-class masks built when the model was loaded
+            eligible = req.ml_model.class_mask(req.pathway, program_type=program_type)
+
+            # If no program of this type exists, return empty with message
+            if not eligible.any():
+                raise RecommendationError(f'No {program_type} programs found. Please try different criteria.')
+
+            # Field-based filtering (optional) - Use the 'field' column from metadata
+            # Only applied if some eligible program is in that field; those programs get an extra bonus
+            field_of_interest = responses.get('field_of_interest', '').lower()
+            field_matched = False
+            if field_of_interest:
+                field_eligible = eligible & req.ml_model.class_mask(req.pathway, field=field_of_interest)
+                if field_eligible.any():
+                    eligible = field_eligible
+                    field_matched = True
+
+            req.class_mask = eligible
+            req.mask_key = (program_type, field_of_interest if field_matched else None)
+            req.bonus = FIELD_MATCH_BONUS if field_matched else 0.0
+        return req
+
+    def infer(self, req):
+        if req.pathway in req.ml_model.models:
+            req.probs, req.top_idx = req.ml_model.candidates(
+                req.pathway, req.features, CANDIDATES.get(req.pathway, RESULTS), req.class_mask)
+        return req
+
+    def boost(self, req):
+        if req.top_idx is not None:
+            req.match, req.score = req.ml_model.boost(req.pathway, req.probs, req.top_idx, req.category, req.bonus)
+        return req
+
+    def rank(self, req):
+        if req.top_idx is None:
+            req.recommendations = []
+        else:
+            req.recommendations = req.ml_model.rank(req.pathway, req.top_idx, req.match, req.score, n=RESULTS)
+        return req
+
+    def persist(self, req):
+        if self.persist_responses is not None:
+            self.persist_responses(req.user_id, req.pathway, req.responses)
+        return req
+
+    def stats(self):
+        """{stage: latency histogram summary} for this process"""
+        return {stage: histogram.stats() for stage, histogram in self.histograms.items()}
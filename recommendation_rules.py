@@ -0,0 +1,191 @@
+"""
+Static rules used to filter and boost model recommendations.
+
+Shared by the request handlers and MLModel, which turns them into per-class masks at load time.
+The keyword tables are compiled into KeywordScorers once, at import.
+"""
+
+from keyword_scorer import KeywordScorer
+
+# Define program categories with improved matching
+# NOTE: Removed trailing spaces from graduate keywords (ms, ma) to allow matching "MS in Engineering"
+SHS_PROGRAMS = ['stem track', 'ict track', 'abm track', 'humss', 'humanities track', 'tvl', 'arts track', 'sports science']
+COLLEGE_PROGRAMS = ['bachelor', 'bs ', 'ba ', 'bsit', 'bscs', 'bsba', 'bsedu', 'bsn', 'bshrm', 'bsarch']
+ALS_PROGRAMS = ['als', 'alternative learning', 'accreditation', 'equivalency']
+GRADUATE_PROGRAMS = ['master', 'mba', 'phd', 'doctorate', 'ms', 'ma', 'doctor', 'executive mba', 'professional certification', 'professional master', 'cpa review', 'pmp', 'cisa', 'lpt review', 'dba', 'med', 'edd']
+
+PROGRAM_TYPES = ('shs', 'college', 'als', 'graduate')
+
+# Define allowed program types based on education level
+ALLOWED_PROGRAMS = {
+    'master': ['graduate', 'college'],  # Allow second bachelor's degree
+    'bachelor': ['graduate', 'college'],
+    'associate': ['college', 'graduate'],
+    'vocational': ['college', 'graduate', 'als'],  # Keep for backward compatibility
+    'high_school': ['shs', 'college', 'als'],
+    'phd': ['graduate']  # PhD holders can pursue additional graduate degrees
+}
+
+def matches_program_type(program_type, title):
+    """Whether an education program title belongs to the selected program type"""
+    title = title.lower()
+    if program_type == 'shs':
+        return any(prog in title for prog in SHS_PROGRAMS)
+    if program_type == 'college':
+        return any(prog in title for prog in COLLEGE_PROGRAMS)
+    if program_type == 'als':
+        return any(prog in title for prog in ALS_PROGRAMS)
+    if program_type == 'graduate':
+        # For graduate programs, check for graduate keywords
+        has_graduate_keyword = any(kw in title for kw in GRADUATE_PROGRAMS)
+        # More relaxed bachelor exclusion - only check for exact bachelor degree patterns
+        has_bachelor_keyword = 'bachelor' in title or title.startswith('bs ') or title.startswith('ba ')
+        return has_graduate_keyword and not has_bachelor_keyword
+    return False
+
+# Scoring constants for keyword boosting (same for all pathways)
+PRIMARY_KEYWORD_POINTS = 10  # Points awarded per primary keyword match
+SECONDARY_KEYWORD_POINTS = 3  # Points awarded per secondary keyword match
+KEYWORD_POINTS = {'primary': PRIMARY_KEYWORD_POINTS, 'secondary': SECONDARY_KEYWORD_POINTS}
+
+# Define education program keywords for boosting
+PROGRAM_KEYWORDS = {
+    'shs': {
+        'primary': ['stem', 'track', 'abm', 'humss', 'humanities', 'tvl', 'ict', 'arts', 'sports'],
+        'secondary': ['senior', 'high', 'school', 'technical']
+    },
+    'college': {
+        'primary': ['bs', 'ba', 'bsit', 'bscs', 'bsba', 'bsn', 'bse', 'bachelor'],
+        'secondary': ['college', 'degree', 'university', 'program', 'major', 'science', 'arts']
+    },
+    'als': {
+        'primary': ['als', 'alternative', 'learning', 'accreditation', 'equivalency'],
+        'secondary': ['education', 'system', 'program']
+    },
+    'graduate': {
+        'primary': ['master', 'mba', 'phd', 'doctorate', 'ms', 'ma', 'doctor', 'executive mba', 'mat', 'cpa review', 'pmp', 'cisa', 'lpt review', 'dba', 'edd', 'med'],
+        'secondary': ['graduate', 'advanced', 'professional', 'certification', 'research', 'administration', 'review', 'licensed', 'engineering management', 'hospital administration', 'public administration', 'cybersecurity', 'data science']
+    }
+}
+
+# Define career categories with comprehensive keyword matching
+INDUSTRY_KEYWORDS = {
+    'tech': {
+        'primary': ['software', 'developer', 'programmer', 'data', 'analyst', 'it', 'technology', 'web', 'app'],
+        'secondary': ['computer', 'systems', 'technical', 'digital', 'engineer', 'specialist']
+    },
+    'healthcare': {
+        'primary': ['nurse', 'nursing', 'medical', 'health', 'care', 'therapy', 'therapist', 'clinical'],
+        'secondary': ['assistant', 'technician', 'caregiver', 'wellness', 'patient']
+    },
+    'health': {  # Alias for 'healthcare' to support both form inputs and dataset values
+        'primary': ['nurse', 'nursing', 'medical', 'health', 'care', 'therapy', 'therapist', 'clinical'],
+        'secondary': ['assistant', 'technician', 'caregiver', 'wellness', 'patient']
+    },
+    'business': {
+        'primary': ['business', 'management', 'manager', 'accountant', 'finance', 'hr', 'human resources'],
+        'secondary': ['administrator', 'operations', 'executive', 'analyst', 'consultant']
+    },
+    'creative': {
+        'primary': ['design', 'designer', 'graphic', 'content', 'writer', 'creative', 'ux', 'ui', 'artist'],
+        'secondary': ['media', 'visual', 'digital', 'marketing', 'brand']
+    },
+    'engineering': {
+        'primary': ['engineer', 'engineering', 'civil', 'mechanical', 'electrical', 'industrial'],
+        'secondary': ['technical', 'design', 'construction', 'manufacturing', 'automation']
+    },
+    'education': {
+        'primary': ['teacher', 'teaching', 'professor', 'educator', 'instructor', 'tutor', 'education'],
+        'secondary': ['training', 'academic', 'faculty', 'learning', 'curriculum']
+    },
+    'sales': {
+        'primary': ['sales', 'marketing', 'representative', 'account', 'customer', 'business development'],
+        'secondary': ['client', 'service', 'relationship', 'commercial', 'retail']
+    },
+    'service': {
+        'primary': ['waiter', 'chef', 'cook', 'bartender', 'receptionist', 'concierge'],
+        'secondary': ['housekeeping', 'customer service', 'attendant']
+    },
+    'trade': {
+        'primary': ['plumber', 'electrician', 'welder', 'carpenter', 'mechanic', 'automotive'],
+        'secondary': ['technician', 'construction', 'installation']
+    }
+}
+
+# Define TESDA course categories with primary and secondary keywords
+COURSE_KEYWORDS = {
+    'ict': {
+        'primary': ['computer', 'systems servicing', 'programming', 'technology', 'web', 'database', 'network'],
+        'secondary': ['ict', 'servicing', 'tech']
+    },
+    'automotive': {
+        'primary': ['automotive', 'servicing', 'engine', 'automotive servicing', 'diesel', 'transmission'],
+        'secondary': ['motor', 'vehicle', 'mechanic']
+    },
+    'construction': {
+        'primary': ['masonry', 'carpentry', 'welding', 'plumbing', 'construction'],
+        'secondary': ['building', 'installation', 'fabrication', 'repair', 'maintenance']
+    },
+    'electrical': {
+        'primary': ['electrical installation', 'electrical maintenance', 'electrical', 'wiring', 'installation and maintenance'],
+        'secondary': ['installation', 'maintenance', 'wiring']
+    },
+    'electronics': {
+        'primary': ['electronics', 'electrical', 'products assembly', 'servicing'],
+        'secondary': ['maintenance', 'technology']
+    },
+    'food': {
+        'primary': ['cookery', 'bread', 'pastry', 'bartending', 'food processing'],
+        'secondary': ['food', 'beverage', 'cooking']
+    },
+    'healthcare': {
+        'primary': ['caregiving', 'health', 'medical', 'nursing', 'massage therapy', 'health care'],
+        'secondary': ['care', 'assistant']
+    },
+    'beauty': {
+        'primary': ['beauty', 'hairdressing', 'cosmetology'],
+        'secondary': ['hair', 'wellness', 'styling']
+    },
+    'agriculture': {
+        'primary': ['agricultural', 'crops', 'farming'],
+        'secondary': ['agriculture', 'production']
+    }
+}
+
+def _compile(keywords):
+    return {category: KeywordScorer(keywords_dict, KEYWORD_POINTS) for category, keywords_dict in keywords.items()}
+
+PROGRAM_SCORERS = _compile(PROGRAM_KEYWORDS)
+INDUSTRY_SCORERS = _compile(INDUSTRY_KEYWORDS)
+COURSE_SCORERS = _compile(COURSE_KEYWORDS)
+
+PATHWAY_SCORERS = {'education': PROGRAM_SCORERS, 'career': INDUSTRY_SCORERS, 'tesda': COURSE_SCORERS}
+
+# How keyword hits are boosted, per pathway:
+# match = min(max(match, min_base_score) + min(score / score_divisor * bonus_multiplier, max_bonus), max_match_score)
+BOOST_PARAMS = {
+    'education': {
+        'min_base_score': 80.0,  # Increased from 60 to 80 for higher match percentages
+        'score_divisor': 10,
+        'bonus_multiplier': 20,
+        'max_bonus': 35,  # Maximum bonus percentage from keywords
+        'max_match_score': 95.0,  # Maximum possible match percentage
+    },
+    'career': {
+        'min_base_score': 60.0,  # Minimum match percentage for keyword matches
+        'score_divisor': 10,
+        'bonus_multiplier': 20,
+        'max_bonus': 35,
+        'max_match_score': 95.0,
+    },
+    'tesda': {
+        'min_base_score': 60.0,
+        'score_divisor': PRIMARY_KEYWORD_POINTS,  # Each PRIMARY_KEYWORD_POINTS adds bonus_multiplier% to match
+        'bonus_multiplier': 20,
+        'max_bonus': 35,
+        'max_match_score': 95.0,
+    },
+}
+
+# Extra match points for education programs in the selected field of interest
+FIELD_MATCH_BONUS = 5
@@ -1,10 +1,80 @@
 # train_and_save_models.py
+"""
+Training entry point for the career, education and TESDA models.
+
+    python train_model.py [--pathway tesda ...] [--parallel N] [--cpus N] [--precompute] [--force]
+
+Each pathway is described by its entry in TRAINING_SPECS. The pathways are independent, so they
+are trained concurrently in a process pool, and the CPU budget (all usable cores by default) is
+split between the forests being fitted at the same time (n_jobs), so they don't oversubscribe the
+machine. Forests are seeded (FOREST_PARAMS), and n_jobs only changes how trees are spread over
+threads, so the artifacts are the same however the work is split.
+
+Every artifact's manifest records input_hash, a fingerprint of the dataset, its config and the
+hyperparameters; a pathway whose inputs haven't changed since its published version is skipped
+(--force retrains it anyway).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import sklearn
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
 import pandas as pd
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
+from ml_model import MLModel, lookup_table_path
+from artifacts import FORMAT_VERSION, current_manifest, save_artifacts
+
+# Largest table (input combinations x classes) we are willing to materialize (~80 MB of float64)
+MAX_TABLE_CELLS = 10_000_000
+# How many ranked classes to store per combination; larger k is ranked from the stored probabilities
+TABLE_TOP_K = 50
+
+# Hyperparameters shared by every pathway's forest (n_jobs is decided per run, see cpu_plan)
+FOREST_PARAMS = {"n_estimators": 400, "random_state": 42}
+
+# Bump when a change to the training code changes what gets trained, so input_hash() changes too
+# (2: duplicate rows collapsed into sample weights; 3: lookup-table top-k ties in argsort order)
+TRAINING_CODE_VERSION = 3
+
+def collapse_duplicates(X, y):
+    """
+    Merge identical (features, target) rows into one row each, weighted by how often it occurs.
+    returns: (X, y, sample_weight), unique rows in order of first appearance
+    """
+    rows = X.assign(_target=y)
+    counts = rows.groupby(list(rows.columns), sort=False).size()
+    unique = counts.index.to_frame(index=False)
+    return (unique[list(X.columns)], unique["_target"].to_numpy(),
+            counts.to_numpy(dtype=np.float64))
+
+def build_lookup_table(model, encoders, feature_cols, max_cells=MAX_TABLE_CELLS):
+    """
+    Enumerate every combination of encoded feature values and score them all in one pass.
+    Row r of the table is the combination np.unravel_index(r, dims).
+    returns: dict of arrays, or None when the input space is too large
+    """
+    dims = np.array([len(encoders[col].classes_) for col in feature_cols], dtype=np.int64)
+    n_rows = int(np.prod(dims))
+    n_classes = len(model.classes_)
+    if n_rows * n_classes > max_cells:
+        print(f"Skipping lookup table: {n_rows} combinations x {n_classes} classes exceeds {max_cells} cells")
+        return None
+
+    codes = np.stack(np.unravel_index(np.arange(n_rows), dims), axis=1)
+    probs = model.predict_proba(pd.DataFrame(codes, columns=feature_cols))
+    top_idx = MLModel._top_k_indices(probs, TABLE_TOP_K)
+    index_dtype = np.int16 if n_classes <= np.iinfo(np.int16).max else np.int32
+    return {"dims": dims, "probs": probs, "top_idx": top_idx.astype(index_dtype)}
 
-def train_pack(csv_path, model_path, feature_cols, target_col):
+def train_pack(pathway, csv_path, model_path, feature_cols, target_col, precompute=False, n_jobs=-1,
+               input_hash=None):
+    """Train one pathway's forest and publish it; returns the new artifact version"""
     df = pd.read_csv(csv_path)
     # Ensure feature_cols present; if not infer all except target
     if not feature_cols:
@@ -24,29 +94,159 @@ def train_pack(csv_path, model_path, feature_cols, target_col):
     y = y.fillna("NA").astype(str)
     y_enc = y_le.fit_transform(y)
 
-    model = RandomForestClassifier(n_estimators=400, n_jobs=-1, random_state=42)
-    model.fit(X, y_enc)
+    # The datasets repeat rows (programs written twice, careers once per skill); the forest sees
+    # each distinct row once with its count as weight, which splits and leaf fractions honour
+    X_fit, y_fit, weights = collapse_duplicates(X, y_enc)
+    print(f"{pathway}: {len(X)} rows, {len(X_fit)} distinct")
+    model = RandomForestClassifier(n_jobs=n_jobs, **FOREST_PARAMS)
+    model.fit(X_fit, y_fit, sample_weight=weights)
 
     # Save also the raw metadata for mapping predictions to full rows
-    joblib.dump({
+    pack = {
         "model": model,
         "encoders": encoders,
         "target_encoder": y_le,
         "feature_cols": feature_cols,
+        "target_col": target_col,
         "raw_df": df
-    }, model_path)
-
+    }
+    joblib.dump(pack, model_path)
     print("Saved", model_path)
 
-# Career: target = job_title, features = primary_skills,industry,salary,work_environment
-train_pack("career_dataset.csv", "model_career.pkl",
-           ["primary_skills","industry","salary","work_environment"], "job_title")
+    # Lookup tables now live in the artifact directory; one left next to the pickle would be stale
+    table_path = lookup_table_path(model_path)
+    if os.path.exists(table_path):
+        os.remove(table_path)
+        print("Removed stale", table_path)
+
+    table = build_lookup_table(model, encoders, feature_cols) if precompute else None
+    MLModel.prepare_pack(pack)
+    version = save_artifacts(pathway, pack, table=table,
+                             manifest_extra={"input_hash": input_hash} if input_hash else None)
+    print(f"Saved artifacts for {pathway}: {version}" + (f" ({table['probs'].shape[0]} combinations precomputed)" if table else ""))
+    return version
+
+TRAINING_SPECS = {
+    # Career: target = job_title, features = primary_skills,industry,salary,work_environment
+    "career": {"csv_path": "career_dataset.csv", "model_path": "model_career.pkl",
+               "feature_cols": ["primary_skills","industry","salary","work_environment"],
+               "target_col": "job_title"},
+    # Education: target = program_name
+    # IMPORTANT: field is now a FEATURE so model predictions are based on user's field selection
+    "education": {"csv_path": "education_dataset.csv", "model_path": "model_education.pkl",
+                  "feature_cols": ["modality","budget","learning_style","motivation","field"],
+                  "target_col": "program_name"},
+    # TESDA
+    "tesda": {"csv_path": "tesda_dataset.csv", "model_path": "model_tesda.pkl",
+              "feature_cols": ["budget","time_available","location","experience"],
+              "target_col": "course_name"},
+}
+
+def input_hash(pathway, precompute=False):
+    """
+    Fingerprint of everything a pathway's artifacts are built from: the dataset's bytes, its
+    config, the forest hyperparameters and the training code / artifact format / sklearn versions
+    """
+    spec = TRAINING_SPECS[pathway]
+    digest = hashlib.sha256()
+    with open(spec["csv_path"], "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps({
+        "feature_cols": spec["feature_cols"],
+        "target_col": spec["target_col"],
+        "forest": FOREST_PARAMS,
+        "precompute": precompute,
+        "table_top_k": TABLE_TOP_K if precompute else None,
+        "training_code": TRAINING_CODE_VERSION,
+        "artifact_format": FORMAT_VERSION,
+        "sklearn": sklearn.__version__,
+    }, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def cpu_plan(n_pathways, cpus=None, parallel=None):
+    """
+    (pathways trained at once, [n_jobs of each concurrent slot]): cpus split as evenly as possible,
+    one pathway per core at most
+    """
+    cpus = max(1, cpus or available_cpus())
+    parallel = max(1, min(parallel or n_pathways, n_pathways, cpus))
+    return parallel, [cpus // parallel + (1 if slot < cpus % parallel else 0) for slot in range(parallel)]
+
+def _train_one(pathway, precompute, n_jobs, fingerprint):
+    start = time.perf_counter()
+    version = train_pack(pathway, precompute=precompute, n_jobs=n_jobs, input_hash=fingerprint,
+                         **TRAINING_SPECS[pathway])
+    return version, time.perf_counter() - start
+
+def train_all_models(precompute=False, pathways=None, cpus=None, parallel=None, force=False):
+    """
+    Train the given pathways (default: all of them), several at once when there are cores for it.
+    A pathway whose published artifacts were built from the same inputs (input_hash) is skipped
+    unless force is set.
+    returns: {pathway: (version, seconds)}; seconds is None for a skipped pathway
+    """
+    start = time.perf_counter()
+    results = {}
+    fingerprints = {}
+    for pathway in dict.fromkeys(pathways or TRAINING_SPECS):
+        fingerprints[pathway] = input_hash(pathway, precompute)
+        manifest = current_manifest(pathway)
+        if not force and manifest and manifest.get("input_hash") == fingerprints[pathway]:
+            results[pathway] = (manifest["version"], None)
+            print(f"Skipping {pathway}: inputs unchanged since {manifest['version']} (--force to retrain)")
+    todo = [pathway for pathway in fingerprints if pathway not in results]
+
+    if todo:
+        parallel, n_jobs = cpu_plan(len(todo), cpus, parallel)
+        if parallel == 1:
+            for pathway in todo:
+                results[pathway] = _train_one(pathway, precompute, n_jobs[0], fingerprints[pathway])
+        else:
+            print(f"Training {len(todo)} pathways, {parallel} at a time (n_jobs {n_jobs})")
+            # one pathway per slot at a time; a pathway waiting for a slot is submitted only once a
+            # running one finishes, and gets the cores of the slot that finished
+            queue = list(reversed(todo))
+            with ProcessPoolExecutor(max_workers=parallel) as pool:
+                running = {}
+                for slot_jobs in n_jobs:
+                    pathway = queue.pop()
+                    running[pool.submit(_train_one, pathway, precompute, slot_jobs,
+                                        fingerprints[pathway])] = (pathway, slot_jobs)
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pathway, slot_jobs = running.pop(future)
+                        results[pathway] = future.result()
+                        if queue:
+                            pathway = queue.pop()
+                            running[pool.submit(_train_one, pathway, precompute, slot_jobs,
+                                                fingerprints[pathway])] = (pathway, slot_jobs)
 
-# Education: target = program_name
-# IMPORTANT: field is now a FEATURE so model predictions are based on user's field selection
-train_pack("education_dataset.csv", "model_education.pkl",
-           ["modality","budget","learning_style","motivation","field"], "program_name")
+    for pathway in fingerprints:
+        version, seconds = results[pathway]
+        print(f"{pathway:<10} {'unchanged' if seconds is None else f'{seconds:.1f}s':>9}  {version}")
+    print(f"{'total':<10} {time.perf_counter() - start:8.1f}s wall clock")
+    return {pathway: results[pathway] for pathway in fingerprints}
 
-# TESDA
-train_pack("tesda_dataset.csv", "model_tesda.pkl",
-           ["budget","time_available","location","experience"], "course_name")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the career, education and TESDA models")
+    parser.add_argument("--precompute", action="store_true",
+                        help="also materialize a lookup table of predictions for every input combination")
+    parser.add_argument("--pathway", action="append", choices=list(TRAINING_SPECS),
+                        help="train only this pathway (repeatable; default: all)")
+    parser.add_argument("--cpus", type=int, default=None,
+                        help="cores to use in total (default: all available)")
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="pathways to train at once (default: as many as there are pathways, at most one per core)")
+    parser.add_argument("--force", action="store_true",
+                        help="retrain even the pathways whose dataset and settings are unchanged")
+    args = parser.parse_args()
+    train_all_models(precompute=args.precompute, pathways=args.pathway, cpus=args.cpus, parallel=args.parallel,
+                     force=args.force)
@@ -0,0 +1,78 @@
+"""
+Admin user search.
+
+`username LIKE '%term%'` can't use an index, so every keystroke scanned all of users. Matches are
+now found through indexes and returned ranked, a page at a time:
+
+1. usernames starting with the term, alphabetically (so an exact match comes first): a range seek
+   on idx_users_username_lower
+2. every other username containing the term, newest first: the users_fts trigram index (kept in
+   sync with users by triggers, see db.MIGRATIONS), walked in rowid order
+
+Both are keyset-paginated, and a tier is only read once the one before it is exhausted, so a page
+costs about the same however many users there are. The trigram index needs at least 3 characters;
+for shorter terms the second tier walks users newest first with LIKE, stopping at a page of matches.
+"""
+
+import pagination
+
+MIN_FTS_TERM = 3
+
+COLUMNS = ('id', 'email', 'name', 'created_at', 'last_login')
+
+PREFIX_SQL = '''SELECT id, username, NULL, created_at, NULL, lower(username) FROM users
+    WHERE lower(username) >= ? AND lower(username) < ? AND (lower(username), id) > (?, ?)
+    ORDER BY lower(username), id LIMIT ?'''
+
+CONTAINS_FTS_SQL = '''SELECT u.id, u.username, NULL, u.created_at, NULL FROM users_fts f
+    JOIN users u ON u.id = f.rowid
+    WHERE users_fts MATCH ? AND f.rowid < ? AND substr(lower(u.username), 1, ?) != ?
+    ORDER BY f.rowid DESC LIMIT ?'''
+
+CONTAINS_SCAN_SQL = '''SELECT id, username, NULL, created_at, NULL FROM users
+    WHERE lower(username) LIKE ? ESCAPE '\\' AND id < ? AND substr(lower(username), 1, ?) != ?
+    ORDER BY id DESC LIMIT ?'''
+
+# cursor: (tier, key, id); key is the lowercased username in the prefix tier
+PREFIX, CONTAINS = 0, 1
+MAX_ID = 2 ** 63 - 1
+
+# SQLite's lower() only folds A-Z; the term must be folded the same way to compare with lower(username)
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def fts_phrase(term):
+    """term as an FTS5 phrase: matched as a substring by the trigram tokenizer, no query syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+def like_pattern(term):
+    """term as a LIKE pattern matching it anywhere, with its own % and _ taken literally"""
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search(conn, term, limit, cursor=None):
+    """One page of users whose username contains term (ranked, see above) and the next page's cursor"""
+    term = term.translate(ASCII_LOWER)
+    after = pagination.decode_cursor(cursor, length=3)
+    if after is not None and (after[0] not in (PREFIX, CONTAINS) or not isinstance(after[2], int)):
+        raise pagination.InvalidCursor(cursor)
+    tier, key, last_id = after if after is not None else (PREFIX, "", 0)
+
+    users = []
+    if tier == PREFIX:
+        # every string starting with term sorts between term and term + the largest code point
+        rows = conn.execute(PREFIX_SQL, (term, term + "\U0010ffff", key, last_id, limit + 1)).fetchall()
+        users = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        if len(rows) > limit:
+            return users, pagination.encode_cursor(PREFIX, rows[limit - 1][5], rows[limit - 1][0])
+        tier, last_id = CONTAINS, MAX_ID
+
+    remaining = limit - len(users)
+    if len(term) >= MIN_FTS_TERM:
+        sql, match = CONTAINS_FTS_SQL, fts_phrase(term)
+    else:
+        sql, match = CONTAINS_SCAN_SQL, like_pattern(term)
+    rows = conn.execute(sql, (match, last_id, len(term), term, remaining + 1)).fetchall()
+    users += [dict(zip(COLUMNS, row)) for row in rows[:remaining]]
+    next_cursor = None
+    if len(rows) > remaining:
+        next_cursor = pagination.encode_cursor(CONTAINS, "", rows[remaining - 1][0] if remaining else last_id)
+    return users, next_cursor
@@ -0,0 +1,167 @@
+"""
+Write-behind persistence for questionnaire answers.
+
+/submit_pathway used to open a connection, insert one responses row and commit (an fsync) before
+answering. ResponseWriter.put() only enqueues the row; a background thread drains the queue and
+writes whatever has accumulated in one transaction (group commit), flushing once batch_size rows
+are waiting or flush_interval seconds after the first one arrived, and again on shutdown.
+
+The queue is bounded: when it stays full for put_timeout seconds, put() writes the row itself, so
+a stalled database slows requests down instead of losing answers. created_at is taken when the
+row is enqueued. Each process has its own writer thread, started on first use (threads don't
+survive gunicorn's fork).
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import db
+from latency_histogram import LatencyHistogram
+
+INSERT_SQL = 'INSERT INTO responses (user_id, pathway, responses, created_at) VALUES (?, ?, ?, ?)'
+
+class ResponseWriter:
+    def __init__(self, db_path=db.DB_PATH, maxsize=10000, batch_size=200, flush_interval=0.05,
+                 put_timeout=1.0, retries=3):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self.flush_latency = LatencyHistogram()
+        # the counters below are updated by request threads and the writer thread
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.sync_writes = 0  # rows written by put() itself because the queue stayed full
+        self.dropped = 0      # rows given up on after `retries` failed attempts
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            # fresh queue per process: one inherited from the master could hold a locked mutex
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.maxsize)
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="response-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, user_id, pathway, responses):
+        """Queue one responses row for writing"""
+        row = (user_id, pathway, str(responses), datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            self._count("enqueued")
+        except queue.Full:
+            self._count("sync_writes")
+            self._write([row], batch=False)
+
+    def _run(self):
+        q = self._queue
+        while True:
+            row = q.get()
+            if row is None:
+                q.task_done()
+                return
+            batch = [row]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = q.get(timeout=max(0.0, deadline - time.monotonic())) if not self._stopping else q.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                q.task_done()
+            if stop:
+                return
+
+    def _write(self, rows, batch=True):
+        start = time.perf_counter_ns()
+        for attempt in range(1, self.retries + 1):
+            try:
+                conn = db.connect(self.db_path)
+                with conn:  # one transaction, one commit for the whole batch
+                    conn.executemany(INSERT_SQL, rows)
+                self._count("written", len(rows))
+                break
+            except sqlite3.IntegrityError:
+                # e.g. the user was deleted meanwhile; don't let one row sink the whole batch
+                if len(rows) == 1:
+                    print(f"Response writer: dropped a row that violates a constraint: {rows[0][:2]}")
+                    self._count("dropped")
+                else:
+                    for row in rows:
+                        self._write([row], batch=False)
+                break
+            except sqlite3.Error as e:
+                print(f"Response writer: writing {len(rows)} rows failed (attempt {attempt}): {e}")
+                if attempt == self.retries:
+                    self._count("dropped", len(rows))
+                else:
+                    time.sleep(0.1 * attempt)
+        if batch:
+            self._count("batches")
+            self.flush_latency.record(time.perf_counter_ns() - start)
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def flush(self, timeout=None):
+        """Block until every row queued so far is written (or timeout seconds have passed)"""
+        if self._pid != os.getpid() or self._queue is None:
+            return
+        if timeout is None:
+            self._queue.join()
+            return
+        # Queue.join has no timeout
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self, timeout=10):
+        """Write everything still queued and stop the writer thread"""
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping = True
+        self._queue.put(None)  # may block briefly if the queue is full; the writer is draining it
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            enqueued, written, batches = self.enqueued, self.written, self.batches
+            sync_writes, dropped = self.sync_writes, self.dropped
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+            "maxsize": self.maxsize,
+            "enqueued": enqueued,
+            "written": written,
+            "batches": batches,
+            "avg_batch_size": round((written - sync_writes) / batches, 2) if batches else 0.0,
+            "sync_writes": sync_writes,
+            "dropped": dropped,
+            "flush_latency": self.flush_latency.stats(),
+        }